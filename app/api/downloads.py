@@ -1,22 +1,52 @@
+import base64
+import binascii
+import hashlib
 import uuid
 from datetime import datetime
-from typing import List, Optional
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
 
-from fastapi import APIRouter, Body, Depends, HTTPException, Query, Response, status
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Query, Request, Response, status
+from pydantic import ValidationError
 from rq import Queue
 from rq.exceptions import InvalidJobOperation
-from rq.job import Job
+from rq.job import JobStatus
+from rq.registry import ScheduledJobRegistry
 
+from app.api.responses import json_response
 from app.api.security import require_token
 from app.config import settings
-from app.db import session_scope
-from app.models import DownloadCreate, DownloadRead, DownloadStatus
-from app.notifications import notification_manager
-from app.queue import get_queue
-from app.repositories.downloads import DownloadRepository
+from app.db import run_blocking, session_scope
+from app.models import (
+    BatchEntryStatus,
+    DownloadBatchCreate,
+    DownloadBatchEntryResult,
+    DownloadBatchRead,
+    DownloadChanges,
+    DownloadCreate,
+    DownloadPriorityUpdate,
+    DownloadRead,
+    DownloadStatus,
+    DownloadSummary,
+)
+from app.models.entities import Download
+from app.notifications import announce
+from app.queue import (
+    QUEUE_TIERS,
+    fetch_download_job,
+    get_queue,
+    get_redis,
+    job_id_for,
+    mark_tier_entered,
+    queue_name_for,
+)
+from app.repositories.downloads import ChangeToken, DownloadRepository, PageCursor
+from app.services.download_manager import destination_for
+from app.services.urls import unique_urls, url_hash
 
 router = APIRouter(dependencies=[Depends(require_token)])
 
+# (index, validated entry, unique URLs, URL hashes) for each accepted batch entry.
+BatchEntry = Tuple[int, DownloadCreate, List[str], List[str]]
 
 @router.post("", response_model=DownloadRead, status_code=status.HTTP_202_ACCEPTED)
 async def enqueue_download(
@@ -51,62 +81,352 @@ async def enqueue_download(
         payload.post_title = post_title
 
     download_id = uuid.uuid4()
-    normalized_urls = [str(url) for url in payload.urls]
-    created_new = False
+    normalized_urls = unique_urls(str(url) for url in payload.urls)
+    record, created_new = await run_blocking(_store_download, download_id, normalized_urls, payload)
+    if not created_new:
+        response.status_code = status.HTTP_200_OK
+        return record
+
+    await announce(
+        {
+            "type": "queued",
+            "download_id": str(download_id),
+            "urls": normalized_urls,
+            "post_title": payload.post_title,
+            "label": payload.label,
+            "queued_at": datetime.utcnow().isoformat() + "Z",
+        }
+    )
+
+    return record
+
+
+@router.post("/batch", response_model=DownloadBatchRead, status_code=status.HTTP_202_ACCEPTED)
+async def enqueue_download_batch(payload: DownloadBatchCreate) -> DownloadBatchRead:
+    """Queue many downloads with one dedup query, one insert and one Redis round trip."""
+    if len(payload.entries) > settings.downloads_batch_max_entries:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"A batch may contain at most {settings.downloads_batch_max_entries} entries.",
+        )
+
+    results: List[DownloadBatchEntryResult] = []
+    accepted: List[BatchEntry] = []
+    for index, raw_entry in enumerate(payload.entries):
+        try:
+            entry = DownloadCreate.model_validate(raw_entry)
+        except ValidationError as exc:
+            results.append(
+                DownloadBatchEntryResult(
+                    index=index, status=BatchEntryStatus.rejected, detail=_format_validation_error(exc)
+                )
+            )
+            continue
+        entry_urls = unique_urls(str(url) for url in entry.urls)
+        accepted.append((index, entry, entry_urls, [url_hash(url) for url in entry_urls]))
+
+    stored_results, records = await run_blocking(_store_batch, accepted)
+    results.extend(stored_results)
+
+    if records:
+        queued_at = datetime.utcnow().isoformat() + "Z"
+        await announce(
+            {
+                "type": "queued_batch",
+                "downloads": [
+                    {
+                        "download_id": str(record["download_id"]),
+                        "urls": record["urls"],
+                        "post_title": record["post_title"],
+                        "label": record["label"],
+                    }
+                    for record in records
+                ],
+                "queued_at": queued_at,
+            }
+        )
+
+    results.sort(key=lambda result: result.index)
+    return DownloadBatchRead(results=results)
+
+
+@router.get("/changes", response_model=DownloadChanges)
+async def list_download_changes(
+    request: Request,
+    since: Optional[str] = Query(
+        None, description="Token from `next_since` of the previous call; omit it to start from the oldest change."
+    ),
+    limit: Optional[int] = Query(
+        None, ge=1, description="Maximum number of downloads to return. Defaults to the configured page size."
+    ),
+    summary: bool = Query(
+        False, description="Omit `items` and return only `item_count` and `total_bytes` per download."
+    ),
+) -> Response:
+    """Return downloads created or changed since `since`, oldest change first.
+
+    Deleted downloads are not reported.
+    """
+    page_size = min(limit or settings.downloads_page_size, settings.downloads_max_page_size)
+    after = _decode_change_token(since) if since else None
+    return await run_blocking(
+        _changes_response,
+        request.headers.get("accept-encoding"),
+        limit=page_size,
+        after=after,
+        include_items=not summary,
+    )
+
+
+@router.get("/{download_id}", response_model=DownloadRead)
+async def get_download(
+    download_id: uuid.UUID,
+    request: Request,
+    if_none_match: Optional[str] = Header(None, description="ETag of a copy the client already holds."),
+) -> Response:
+    if if_none_match:
+        updated_at = await run_blocking(_load_updated_at, download_id)
+        if updated_at is not None and _etag_matches(if_none_match, _download_etag(updated_at)):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": _download_etag(updated_at)})
+    rendered = await run_blocking(_download_response, download_id, request.headers.get("accept-encoding"))
+    if rendered is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Download {download_id} not found")
+    return rendered
+
+
+@router.get("", response_model=list[Union[DownloadRead, DownloadSummary]])
+async def list_downloads(
+    request: Request,
+    limit: Optional[int] = Query(
+        None, ge=1, description="Maximum number of downloads to return. Defaults to the configured page size."
+    ),
+    cursor: Optional[str] = Query(
+        None, description="Opaque cursor taken from the `X-Next-Cursor` header of the previous page."
+    ),
+    statuses: Optional[List[DownloadStatus]] = Query(
+        None, alias="status", description="Repeated query parameter restricting the listed statuses."
+    ),
+    label: Optional[str] = Query(None, description="Only return downloads with this exact label."),
+    post_title: Optional[str] = Query(None, description="Only return downloads with this exact post title."),
+    requested_from: Optional[datetime] = Query(
+        None, description="Only return downloads requested at or after this timestamp."
+    ),
+    requested_to: Optional[datetime] = Query(
+        None, description="Only return downloads requested before this timestamp."
+    ),
+    summary: bool = Query(
+        False, description="Omit `items` and return only `item_count` and `total_bytes` per download."
+    ),
+    if_none_match: Optional[str] = Header(None, description="ETag of a copy of this page the client already holds."),
+) -> Response:
+    page_size = min(limit or settings.downloads_page_size, settings.downloads_max_page_size)
+    after = _decode_cursor(cursor) if cursor else None
+    filters = dict(
+        limit=page_size,
+        after=after,
+        statuses=statuses,
+        label=label,
+        post_title=post_title,
+        requested_from=requested_from,
+        requested_to=requested_to,
+    )
+    if if_none_match:
+        # Compare against the page's ids and versions before loading items.
+        versions, next_cursor = await run_blocking(_list_page_versions, **filters)
+        etag = _page_etag(versions, next_cursor)
+        if _etag_matches(if_none_match, etag):
+            headers = {"ETag": etag}
+            if next_cursor is not None:
+                headers["X-Next-Cursor"] = _encode_cursor(next_cursor)
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return await run_blocking(
+        _page_response, request.headers.get("accept-encoding"), **filters, include_items=not summary
+    )
+
+
+@router.post("/{download_id}/retry", response_model=DownloadRead)
+async def retry_download(download_id: uuid.UUID) -> DownloadRead:
+    record = await run_blocking(_retry_download, download_id)
+
+    await announce(
+        {
+            "type": "queued",
+            "download_id": str(download_id),
+            "urls": record.urls,
+            "post_title": record.post_title,
+            "label": record.label,
+            "queued_at": datetime.utcnow().isoformat() + "Z",
+        }
+    )
+
+    return record
+
+
+@router.post("/{download_id}/cancel", response_model=DownloadRead)
+async def cancel_download(download_id: uuid.UUID) -> DownloadRead:
+    record = await run_blocking(_cancel_download, download_id)
+
+    await announce(
+        {
+            "type": "cancelled",
+            "download_id": str(download_id),
+            "urls": record.urls if record else [],
+            "post_title": record.post_title if record else None,
+            "label": record.label if record else None,
+            "finished_at": datetime.utcnow().isoformat() + "Z",
+        }
+    )
+
+    return record
+
+
+@router.put("/{download_id}/priority", response_model=DownloadRead)
+async def update_download_priority(download_id: uuid.UUID, payload: DownloadPriorityUpdate) -> DownloadRead:
+    return await run_blocking(_update_priority, download_id, payload.priority)
+
+
+@router.delete("/{download_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_download(download_id: uuid.UUID) -> None:
+    await run_blocking(_delete_download, download_id)
+
+
+# The helpers below do blocking database and Redis work; handlers call them
+# through `run_blocking` so they run on the bounded API thread pool.
+
+
+def _store_download(
+    download_id: uuid.UUID, normalized_urls: List[str], payload: DownloadCreate
+) -> Tuple[DownloadRead, bool]:
+    """Create and enqueue a download, or return the active duplicate and False."""
     with session_scope() as session:
         repo = DownloadRepository(session)
-        existing = repo.find_active_by_urls(normalized_urls)
+        existing, failed_entity = repo.find_duplicates(normalized_urls)
         if existing:
-            response.status_code = status.HTTP_200_OK
-            return existing
-        failed_entity = repo.find_failed_by_urls(normalized_urls)
-        if failed_entity:
-            repo.delete(failed_entity.id)
+            return existing, False
         record = repo.create(
             download_id=download_id,
             urls=normalized_urls,
             label=payload.label,
             post_title=payload.post_title,
             requested_at=datetime.utcnow(),
+            priority=payload.priority,
+            replacing=failed_entity.id if failed_entity else None,
+            inherit_items=failed_entity is not None
+            and _shares_destination(failed_entity, download_id, normalized_urls, payload.post_title),
         )
-        created_new = True
 
-    _enqueue_download_job(download_id, normalized_urls, payload.post_title)
+    _enqueue_download_job(download_id, normalized_urls, payload.post_title, record.priority)
+    return record, True
 
-    if created_new:
-        await notification_manager.broadcast(
-            {
-                "type": "queued",
-                "download_id": str(download_id),
-                "urls": normalized_urls,
-                "post_title": payload.post_title,
-                "label": payload.label,
-                "queued_at": datetime.utcnow().isoformat() + "Z",
-            }
-        )
 
-    return record
+def _shares_destination(
+    failed: Download, download_id: uuid.UUID, urls: Sequence[str], post_title: Optional[str]
+) -> bool:
+    """Whether a resubmission downloads into the folder of the failed download it replaces.
 
+    The worker only records files a job adds or changes, so files left there by
+    the failed attempt must be carried over with its items rather than dropped.
+    """
+    return destination_for(failed.id, failed.urls, failed.post_title) == destination_for(download_id, urls, post_title)
 
-@router.get("/{download_id}", response_model=DownloadRead)
-async def get_download(download_id: uuid.UUID) -> DownloadRead:
+
+def _store_batch(accepted: Sequence[BatchEntry]) -> Tuple[List[DownloadBatchEntryResult], List[dict]]:
+    requested_at = datetime.utcnow()
+    results: List[DownloadBatchEntryResult] = []
+    records: List[dict] = []
+    replacing: Set[uuid.UUID] = set()
     with session_scope() as session:
         repo = DownloadRepository(session)
-        record = repo.get(download_id)
-        if record is None:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Download {download_id} not found")
-        return record
+        known = repo.find_by_url_hashes(digest for *_, hashes in accepted for digest in hashes)
+        claimed: Dict[str, uuid.UUID] = {}
+        for index, entry, entry_urls, hashes in accepted:
+            existing_id = _find_batch_duplicate(hashes, known, claimed)
+            if existing_id is not None:
+                results.append(
+                    DownloadBatchEntryResult(index=index, status=BatchEntryStatus.existing, download_id=existing_id)
+                )
+                continue
+            failed = {
+                entity.id: entity
+                for digest in hashes
+                for entity in known.get(digest, [])
+                if entity.status == DownloadStatus.failed
+            }
+            replacing.update(failed)
+            download_id = uuid.uuid4()
+            claimed.update((digest, download_id) for digest in hashes)
+            records.append(
+                {
+                    "download_id": download_id,
+                    "urls": entry_urls,
+                    "label": entry.label,
+                    "post_title": entry.post_title,
+                    "priority": entry.priority,
+                    "requested_at": requested_at,
+                    "inherits": next(
+                        (
+                            entity.id
+                            for entity in failed.values()
+                            if _shares_destination(entity, download_id, entry_urls, entry.post_title)
+                        ),
+                        None,
+                    ),
+                }
+            )
+            results.append(
+                DownloadBatchEntryResult(index=index, status=BatchEntryStatus.created, download_id=download_id)
+            )
+        repo.create_many(records, replacing=list(replacing))
 
+    if records:
+        _enqueue_download_jobs(records)
+    return results, records
 
-@router.get("", response_model=list[DownloadRead])
-async def list_downloads() -> list[DownloadRead]:
+
+def _load_updated_at(download_id: uuid.UUID) -> Optional[datetime]:
     with session_scope() as session:
-        repo = DownloadRepository(session)
-        return repo.list()
+        return DownloadRepository(session).get_updated_at(download_id)
 
 
-@router.post("/{download_id}/retry", response_model=DownloadRead)
-async def retry_download(download_id: uuid.UUID) -> DownloadRead:
+def _list_page_versions(**filters) -> Tuple[List[Tuple[uuid.UUID, datetime]], Optional[PageCursor]]:
+    with session_scope() as session:
+        return DownloadRepository(session).list_page_versions(**filters)
+
+
+# Read endpoints encode rows directly (see `app.api.responses`); their
+# `response_model` only documents the shape.
+
+
+def _download_response(download_id: uuid.UUID, accept_encoding: Optional[str]) -> Optional[Response]:
+    with session_scope() as session:
+        payload = DownloadRepository(session).get_payload(download_id)
+    if payload is None:
+        return None
+    return json_response(
+        payload, accept_encoding=accept_encoding, headers={"ETag": _download_etag(payload["updated_at"])}
+    )
+
+
+def _page_response(accept_encoding: Optional[str], **filters) -> Response:
+    with session_scope() as session:
+        payloads, next_cursor = DownloadRepository(session).list_page_payloads(**filters)
+    headers = {"ETag": _page_etag([(payload["id"], payload["updated_at"]) for payload in payloads], next_cursor)}
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = _encode_cursor(next_cursor)
+    return json_response(payloads, accept_encoding=accept_encoding, headers=headers)
+
+
+def _changes_response(accept_encoding: Optional[str], **options) -> Response:
+    with session_scope() as session:
+        payloads, token, has_more = DownloadRepository(session).list_changes(**options)
+    return json_response(
+        {"downloads": payloads, "next_since": _encode_change_token(token), "has_more": has_more},
+        accept_encoding=accept_encoding,
+    )
+
+
+def _retry_download(download_id: uuid.UUID) -> DownloadRead:
     with session_scope() as session:
         repo = DownloadRepository(session)
         entity = repo.get_entity(download_id)
@@ -120,24 +440,11 @@ async def retry_download(download_id: uuid.UUID) -> DownloadRead:
         record = repo.reset_for_retry(download_id, requested_at=datetime.utcnow())
         assert record is not None
 
-    _enqueue_download_job(download_id, record.urls, record.post_title)
-
-    await notification_manager.broadcast(
-        {
-            "type": "queued",
-            "download_id": str(download_id),
-            "urls": record.urls,
-            "post_title": record.post_title,
-            "label": record.label,
-            "queued_at": datetime.utcnow().isoformat() + "Z",
-        }
-    )
-
+    _enqueue_download_job(download_id, record.urls, record.post_title, record.priority)
     return record
 
 
-@router.post("/{download_id}/cancel", response_model=DownloadRead)
-async def cancel_download(download_id: uuid.UUID) -> DownloadRead:
+def _cancel_download(download_id: uuid.UUID) -> Optional[DownloadRead]:
     with session_scope() as session:
         repo = DownloadRepository(session)
         entity = repo.get_entity(download_id)
@@ -151,23 +458,28 @@ async def cancel_download(download_id: uuid.UUID) -> DownloadRead:
         record = repo.cancel(download_id, finished_at=datetime.utcnow())
 
     _remove_pending_job(download_id)
+    return record
 
-    await notification_manager.broadcast(
-        {
-            "type": "cancelled",
-            "download_id": str(download_id),
-            "urls": record.urls if record else [],
-            "post_title": record.post_title if record else None,
-            "label": record.label if record else None,
-            "finished_at": datetime.utcnow().isoformat() + "Z",
-        }
-    )
 
+def _update_priority(download_id: uuid.UUID, priority: int) -> DownloadRead:
+    with session_scope() as session:
+        repo = DownloadRepository(session)
+        entity = repo.get_entity(download_id)
+        if entity is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Download not found")
+        if entity.status != DownloadStatus.queued:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Only queued downloads can be reprioritized.",
+            )
+        record = repo.set_priority(download_id, priority)
+        assert record is not None
+
+    _move_pending_job(download_id, queue_name_for(priority))
     return record
 
 
-@router.delete("/{download_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_download(download_id: uuid.UUID) -> None:
+def _delete_download(download_id: uuid.UUID) -> None:
     with session_scope() as session:
         repo = DownloadRepository(session)
         entity = repo.get_entity(download_id)
@@ -181,21 +493,145 @@ async def delete_download(download_id: uuid.UUID) -> None:
         repo.delete(download_id)
 
 
-def _enqueue_download_job(download_id: uuid.UUID, urls: List[str], post_title: Optional[str]) -> None:
-    queue = get_queue()
+def _encode_cursor(cursor: PageCursor) -> str:
+    timestamp, download_id = cursor
+    raw = f"{timestamp.isoformat()}|{download_id.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(token: str) -> PageCursor:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        timestamp, download_id = raw.split("|", 1)
+        return datetime.fromisoformat(timestamp), uuid.UUID(download_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid pagination cursor.")
+
+
+def _encode_change_token(token: ChangeToken) -> str:
+    change_seq, download_id = token
+    raw = f"{change_seq}|{download_id.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_change_token(token: str) -> ChangeToken:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode()
+        change_seq, download_id = raw.split("|", 1)
+        return int(change_seq), uuid.UUID(download_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid changes token.")
+
+
+def _download_etag(updated_at: datetime) -> str:
+    return f'W/"{updated_at.isoformat()}"'
+
+
+def _page_etag(versions: Sequence[Tuple[uuid.UUID, datetime]], next_cursor: Optional[PageCursor]) -> str:
+    digest = hashlib.sha1()
+    for download_id, updated_at in versions:
+        digest.update(f"{download_id.hex}:{updated_at.isoformat()};".encode())
+    if next_cursor is not None:
+        digest.update(_encode_cursor(next_cursor).encode())
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison, as `If-None-Match` uses: `W/` prefixes are ignored."""
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
+
+
+def _enqueue_download_job(
+    download_id: uuid.UUID, urls: List[str], post_title: Optional[str], priority: Optional[int]
+) -> None:
+    queue = get_queue(queue_name_for(priority))
     _remove_pending_job(download_id, queue)
     queue.enqueue(
         "app.worker.process_download",
         download_id=str(download_id),
         urls=urls,
         post_title=post_title,
+        job_id=job_id_for(download_id),
         job_timeout=settings.job_timeout_seconds,
     )
 
 
+def _enqueue_download_jobs(records: Sequence[dict]) -> None:
+    """Enqueue freshly created downloads through a single Redis pipeline."""
+    connection = get_redis()
+    with connection.pipeline() as pipeline:
+        for queue_name in QUEUE_TIERS:
+            tier = [record for record in records if queue_name_for(record.get("priority")) == queue_name]
+            if not tier:
+                continue
+            Queue(queue_name, connection=connection).enqueue_many(
+                [
+                    Queue.prepare_data(
+                        "app.worker.process_download",
+                        kwargs={
+                            "download_id": str(record["download_id"]),
+                            "urls": record["urls"],
+                            "post_title": record["post_title"],
+                        },
+                        timeout=settings.job_timeout_seconds,
+                        job_id=job_id_for(record["download_id"]),
+                    )
+                    for record in tier
+                ],
+                pipeline=pipeline,
+            )
+        pipeline.execute()
+
+
+def _move_pending_job(download_id: uuid.UUID, queue_name: str) -> bool:
+    """Move a waiting job to another priority tier, keeping its deferral if it has one."""
+    target_queue = get_queue(queue_name)
+    job = fetch_download_job(download_id, target_queue.connection)
+    if job is None or job.origin == queue_name:
+        return False
+    source_queue = get_queue(job.origin)
+    job_status = job.get_status()
+    # Aging in the new tier starts now, so a job lowered on purpose is not promoted right back.
+    mark_tier_entered(job)
+    if job_status == JobStatus.QUEUED:
+        source_queue.remove(job)
+        target_queue.enqueue_job(job)
+        return True
+    if job_status == JobStatus.SCHEDULED:
+        registry = ScheduledJobRegistry(queue=source_queue)
+        scheduled_at = registry.get_scheduled_time(job)
+        registry.remove(job)
+        target_queue.schedule_job(job, scheduled_at)
+        return True
+    return False
+
+
+def _find_batch_duplicate(
+    hashes: Sequence[str],
+    known: Dict[str, List[Download]],
+    claimed: Dict[str, uuid.UUID],
+) -> Optional[uuid.UUID]:
+    """Return the download an entry duplicates, whether stored or created earlier in the batch."""
+    for digest in hashes:
+        if digest in claimed:
+            return claimed[digest]
+        for entity in known.get(digest, []):
+            if entity.status != DownloadStatus.failed:
+                return entity.id
+    return None
+
+
+def _format_validation_error(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'entry'}: {error['msg']}" for error in exc.errors()
+    )
+
+
 def _remove_pending_job(download_id: uuid.UUID, queue: Optional[Queue] = None) -> bool:
-    target_queue = queue or get_queue()
-    job = _find_job_by_download(target_queue, download_id)
+    job = fetch_download_job(download_id, queue.connection if queue is not None else None)
     if job is None:
         return False
     try:
@@ -205,14 +641,3 @@ def _remove_pending_job(download_id: uuid.UUID, queue: Optional[Queue] = None) -
         pass
     job.delete()
     return True
-
-
-def _find_job_by_download(queue: Queue, download_id: uuid.UUID) -> Optional[Job]:
-    target = str(download_id)
-    for job_id in queue.get_job_ids():
-        job = queue.fetch_job(job_id)
-        if job is None:
-            continue
-        if (job.kwargs or {}).get("download_id") == target:
-            return job
-    return None
@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.api.security import require_token
+from app.config import settings
+from app.db import run_blocking
+from app.telemetry import registry
+
+router = APIRouter()
+
+
+@router.get("/metrics", dependencies=[Depends(require_token)])
+async def metrics() -> Response:
+    """Expose API, queue and worker metrics in the Prometheus text format."""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Metrics are disabled.")
+    # Collection reads queue depths and worker metrics from Redis.
+    body = await run_blocking(generate_latest, registry)
+    return Response(body, media_type=CONTENT_TYPE_LATEST)
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 from typing import Optional
 
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from fastapi import APIRouter, Depends, Query, WebSocket, WebSocketDisconnect, status
 
+from app.api.security import require_token
 from app.config import settings
+from app.models.schemas import NotificationStats
 from app.notifications import notification_manager
 
 router = APIRouter()
@@ -19,16 +21,16 @@ async def _extract_token(websocket: WebSocket) -> Optional[str]:
 
 
 @router.websocket("/ws/notifications")
-async def notifications_endpoint(websocket: WebSocket) -> None:
-    """Stream download notifications to connected clients."""
+async def notifications_endpoint(websocket: WebSocket, since: Optional[int] = Query(None, ge=0)) -> None:
+    """Stream download notifications, replaying those numbered after `since` first."""
     token = await _extract_token(websocket)
     if token != settings.api_token:
         await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Invalid token")
         return
 
-    await notification_manager.connect(websocket)
+    # The connection's sender task delivers the welcome message and all events.
+    await notification_manager.connect(websocket, since)
     try:
-        await websocket.send_json({"type": "welcome", "message": "notifications-ready"})
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
@@ -37,3 +39,9 @@ async def notifications_endpoint(websocket: WebSocket) -> None:
         await websocket.close(code=1011)
     finally:
         await notification_manager.disconnect(websocket)
+
+
+@router.get("/notifications/stats", response_model=NotificationStats, dependencies=[Depends(require_token)])
+async def notification_stats() -> NotificationStats:
+    """Report connected clients, outbound queue depths and drop counters."""
+    return NotificationStats(**notification_manager.stats())
@@ -0,0 +1,70 @@
+"""JSON responses for payloads built straight from database rows.
+
+Read endpoints assemble plain dicts shaped like their response models from
+values the database already holds in final form, so the `response_model`
+validation pass is skipped and the body is encoded with orjson. Bodies of at
+least `GDL_RESPONSE_COMPRESSION_MIN_BYTES` are compressed with zstd or gzip
+when the client accepts it.
+"""
+
+from __future__ import annotations
+
+import gzip
+from typing import Any, Dict, Mapping, Optional, Set
+
+import orjson
+from fastapi import Response, status
+
+from app.config import settings
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - installed with the `zstd` extra
+    zstandard = None
+
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def json_response(
+    content: Any,
+    *,
+    accept_encoding: Optional[str] = None,
+    headers: Optional[Mapping[str, str]] = None,
+    status_code: int = status.HTTP_200_OK,
+) -> Response:
+    """Encode trusted `content` without validation, compressing it if it is large enough.
+
+    Encoding and compression are CPU-bound; call this through `run_blocking`
+    for large payloads.
+    """
+    body = orjson.dumps(content)
+    response_headers: Dict[str, str] = dict(headers or {})
+    minimum = settings.response_compression_min_bytes
+    if minimum and len(body) >= minimum:
+        response_headers["Vary"] = "Accept-Encoding"
+        accepted = _accepted_encodings(accept_encoding)
+        if zstandard is not None and "zstd" in accepted:
+            body = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+            response_headers["Content-Encoding"] = "zstd"
+        elif "gzip" in accepted:
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            response_headers["Content-Encoding"] = "gzip"
+    return Response(body, status_code=status_code, headers=response_headers, media_type="application/json")
+
+
+def _accepted_encodings(accept_encoding: Optional[str]) -> Set[str]:
+    """Return the codings an `Accept-Encoding` header allows, ignoring those with `q=0`."""
+    accepted: Set[str] = set()
+    for part in (accept_encoding or "").split(","):
+        coding, *params = (piece.strip() for piece in part.split(";"))
+        weight = next((param[2:] for param in params if param.lower().startswith("q=")), "1")
+        try:
+            allowed = float(weight) > 0
+        except ValueError:
+            allowed = False
+        if coding and allowed:
+            accepted.add(coding.lower())
+    if "*" in accepted:
+        accepted.update({"zstd", "gzip"})
+    return accepted
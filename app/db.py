@@ -1,33 +1,121 @@
 from __future__ import annotations
 
+import os
 from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import Iterator
+from typing import Any, Callable, Iterator, Optional, TypeVar
 
-from sqlalchemy import make_url
-from sqlmodel import Session, SQLModel, create_engine
+import anyio
+from sqlalchemy import Connection, event, make_url
+from sqlmodel import Session, create_engine
 
 from app.config import settings
 
 DATABASE_URL = str(settings.database_url)
+MIGRATIONS_PATH = Path(__file__).parent / "migrations"
 url = make_url(DATABASE_URL)
 
 connect_args = {}
-if url.drivername.startswith("sqlite"):
+database_path: Optional[Path] = None
+pool_options = {
+    "pool_size": settings.database_pool_size,
+    "max_overflow": settings.database_max_overflow,
+    "pool_timeout": settings.database_pool_timeout,
+}
+if url.drivername.startswith("sqlite") and url.database in (None, "", ":memory:"):
+    # In-memory databases live on a single connection per thread; there is no pool to size.
+    pool_options = {}
+    connect_args = {"check_same_thread": False}
+elif url.drivername.startswith("sqlite"):
     database_path = Path(url.database or "")
     if not database_path.is_absolute():
         database_path = (Path.cwd() / database_path).resolve()
     database_path.parent.mkdir(parents=True, exist_ok=True)
-    connect_args = {"check_same_thread": False}
+    connect_args = {"check_same_thread": False, "timeout": settings.sqlite_busy_timeout}
+else:
+    # Server databases: drop connections closed by the server or a proxy before they are reused.
+    pool_options.update(pool_pre_ping=True, pool_recycle=settings.database_pool_recycle)
+
+engine = create_engine(
+    DATABASE_URL,
+    echo=False,
+    connect_args=connect_args,
+    **pool_options,
+)
+
+if engine.dialect.name == "sqlite":
 
-engine = create_engine(DATABASE_URL, echo=False, connect_args=connect_args)
+    @event.listens_for(engine, "connect")
+    def _configure_sqlite(dbapi_connection, connection_record) -> None:
+        """Apply the concurrency profile to every new SQLite connection.
+
+        In WAL mode the API keeps reading while a worker commits, and
+        `synchronous=NORMAL` only syncs at checkpoints, which is still safe
+        against corruption. WAL needs shared memory, so every process must
+        see the database file on a local filesystem (not NFS/SMB).
+        """
+        cursor = dbapi_connection.cursor()
+        try:
+            # The journal mode is stored in the database file, so set it either way.
+            if settings.sqlite_wal:
+                cursor.execute("PRAGMA journal_mode=WAL")
+                cursor.execute("PRAGMA synchronous=NORMAL")
+            else:
+                cursor.execute("PRAGMA journal_mode=DELETE")
+            cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout * 1000)}")
+            cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+        finally:
+            cursor.close()
+
+T = TypeVar("T")
+_api_limiter: Optional[anyio.CapacityLimiter] = None
 
 
 def init_db() -> None:
-    """Create database tables if they do not exist."""
-    import app.models.entities  # noqa: F401  (ensure models are registered)
+    """Create the schema or upgrade it to the latest migration."""
+    with _migration_lock(), engine.begin() as connection:
+        upgrade_schema(connection)
+
+
+def upgrade_schema(connection: Connection, revision: str = "head") -> None:
+    """Apply the Alembic migrations under `app/migrations` on `connection`."""
+    from alembic import command
+    from alembic.config import Config
+
+    config = Config()
+    config.set_main_option("script_location", str(MIGRATIONS_PATH))
+    config.attributes["connection"] = connection
+    command.upgrade(config, revision)
+
+
+@contextmanager
+def _migration_lock() -> Iterator[None]:
+    """Let one process at a time upgrade a SQLite database; PostgreSQL uses an advisory lock instead."""
+    if database_path is None or os.name == "nt":
+        yield
+        return
+    import fcntl
+
+    with open(f"{database_path}.migrate-lock", "a") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run blocking database or Redis work from async code on the bounded API thread pool.
 
-    SQLModel.metadata.create_all(engine)
+    The event loop keeps serving other requests and WebSocket broadcasts while
+    the call waits on a lock or the network. At most `api_blocking_threads`
+    calls run at once; further calls wait for a free thread.
+    """
+    global _api_limiter
+    if _api_limiter is None:
+        _api_limiter = anyio.CapacityLimiter(settings.api_blocking_threads)
+    return await anyio.to_thread.run_sync(partial(func, *args, **kwargs), limiter=_api_limiter)
 
 
 @contextmanager
@@ -0,0 +1,38 @@
+"""Queue the background job that deduplicates files downloaded before `GDL_DEDUP_ENABLED` was set.
+
+    uv run python -m app.dedup
+
+The job runs on the low-priority queue, so downloads keep precedence.
+"""
+
+from __future__ import annotations
+
+import argparse
+
+from app.config import settings
+from app.queue import LOW_PRIORITY_QUEUE, close_redis, get_queue
+
+DEDUP_JOB_ID = "dedup-existing-items"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500, help="Items hashed and linked per database batch.")
+    args = parser.parse_args()
+    if not settings.dedup_enabled:
+        parser.error("deduplication is disabled; set GDL_DEDUP_ENABLED=true for the API and workers first")
+
+    try:
+        job = get_queue(LOW_PRIORITY_QUEUE).enqueue(
+            "app.worker.deduplicate_existing_items",
+            batch_size=args.batch_size,
+            job_id=DEDUP_JOB_ID,
+            job_timeout=-1,
+        )
+        print(f"Queued {job.id}")
+    finally:
+        close_redis()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,7 @@
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
+from typing import AsyncIterator
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -7,15 +10,32 @@ from fastapi.staticfiles import StaticFiles
 from app.api import api_router
 from app.config import settings
 from app.db import init_db
+from app.notifications import notification_manager, relay_published_events
+from app.queue import close_redis, init_redis
+from app.telemetry import RequestMetricsMiddleware
 
 init_db()
 
 
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    init_redis()
+    relay = asyncio.create_task(relay_published_events(notification_manager))
+    try:
+        yield
+    finally:
+        relay.cancel()
+        with suppress(asyncio.CancelledError):
+            await relay
+        close_redis()
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
         title="Gallery Downloader Service",
         version="0.1.0",
         description="API gateway for queueing and tracking gallery-dl download jobs.",
+        lifespan=lifespan,
     )
 
     @app.get("/healthz", tags=["health"])
@@ -33,8 +53,12 @@ def create_app() -> FastAPI:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
     )
 
+    if settings.metrics_enabled:
+        app.add_middleware(RequestMetricsMiddleware)
+
     frontend_path = Path(__file__).resolve().parent.parent / "frontend"
     if frontend_path.exists():
         app.mount(
@@ -0,0 +1,61 @@
+"""Alembic environment: migrates the database configured by `GDL_DATABASE_URL`.
+
+`app.db.upgrade_schema` passes its own connection through
+`config.attributes["connection"]`; the `alembic` command line uses the
+application engine.
+"""
+
+from __future__ import annotations
+
+from alembic import context
+from sqlmodel import SQLModel
+
+import app.models.entities  # noqa: F401  (ensure models are registered)
+
+# Any constant works; it only has to be the same for every process.
+POSTGRES_MIGRATION_LOCK = 0x67646C  # "gdl"
+
+config = context.config
+target_metadata = SQLModel.metadata
+
+
+def _configure(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        render_as_batch=connection.dialect.name == "sqlite",
+        compare_type=True,
+    )
+    with context.begin_transaction():
+        if connection.dialect.name == "postgresql":
+            # Processes starting together upgrade one after another; DDL is
+            # transactional, so the lock is held until the upgrade commits.
+            connection.exec_driver_sql(f"SELECT pg_advisory_xact_lock({POSTGRES_MIGRATION_LOCK})")
+        context.run_migrations()
+
+
+def run_migrations_offline() -> None:
+    from app.db import DATABASE_URL
+
+    context.configure(url=DATABASE_URL, target_metadata=target_metadata, literal_binds=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _configure(connection)
+        return
+
+    from app.db import engine
+
+    with engine.connect() as connection:
+        _configure(connection)
+        connection.commit()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
@@ -0,0 +1,105 @@
+"""Baseline schema: downloads, their items and their source URLs.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+
+Databases created before migrations existed were set up by
+`SQLModel.metadata.create_all` plus ad-hoc column additions. For those, this
+revision adds whatever baseline columns and indexes are missing and fills
+`downloadurl.url_hash`, instead of creating the tables.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+metadata = sa.MetaData()
+
+download = sa.Table(
+    "download",
+    metadata,
+    sa.Column("id", sa.Uuid(), primary_key=True),
+    sa.Column(
+        "status",
+        sa.Enum("queued", "running", "succeeded", "failed", "cancelled", name="downloadstatus"),
+        nullable=False,
+    ),
+    sa.Column("urls", sa.JSON(), nullable=False),
+    sa.Column("label", sa.String(), nullable=True),
+    sa.Column("post_title", sa.String(), nullable=True),
+    sa.Column("priority", sa.Integer(), nullable=True),
+    sa.Column("output_path", sa.String(), nullable=True),
+    sa.Column("requested_at", sa.DateTime(), nullable=False),
+    sa.Column("started_at", sa.DateTime(), nullable=True),
+    sa.Column("finished_at", sa.DateTime(), nullable=True),
+    sa.Column("failure_reason", sa.String(), nullable=True),
+    sa.Index("ix_download_requested_at_id", "requested_at", "id"),
+)
+
+download_item = sa.Table(
+    "downloaditem",
+    metadata,
+    sa.Column("id", sa.Uuid(), primary_key=True),
+    sa.Column("download_id", sa.Uuid(), sa.ForeignKey("download.id"), nullable=False, index=True),
+    sa.Column("filename", sa.String(), nullable=False),
+    sa.Column("relative_path", sa.String(), nullable=False),
+    sa.Column("file_size", sa.Integer(), nullable=True),
+    sa.Column("content_type", sa.String(), nullable=True),
+    sa.Column("content_hash", sa.String(64), nullable=True, index=True),
+    sa.Column("created_at", sa.DateTime(), nullable=False),
+)
+
+download_url = sa.Table(
+    "downloadurl",
+    metadata,
+    sa.Column("id", sa.Uuid(), primary_key=True),
+    sa.Column("download_id", sa.Uuid(), sa.ForeignKey("download.id"), nullable=False, index=True),
+    sa.Column("url", sa.String(2048), nullable=False, index=True, unique=True),
+    sa.Column("url_hash", sa.String(64), nullable=True, index=True),
+)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    for table in metadata.sorted_tables:
+        if table.name not in existing:
+            table.create(bind)
+            continue
+        columns = {column["name"] for column in sa.inspect(bind).get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns and column.nullable:
+                op.add_column(table.name, column.copy())
+        for index in table.indexes:
+            index.create(bind, checkfirst=True)
+    if "downloadurl" in existing:
+        _backfill_url_hashes(bind)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    metadata.drop_all(bind)
+    if bind.dialect.name == "postgresql":
+        sa.Enum(name="downloadstatus").drop(bind, checkfirst=True)
+
+
+def _backfill_url_hashes(bind) -> None:
+    from app.services.urls import url_hash
+
+    while True:
+        rows = bind.execute(
+            sa.select(download_url.c.id, download_url.c.url).where(download_url.c.url_hash.is_(None)).limit(1000)
+        ).all()
+        if not rows:
+            break
+        bind.execute(
+            download_url.update().where(download_url.c.id == sa.bindparam("row_id")),
+            [{"row_id": row.id, "url_hash": url_hash(row.url)} for row in rows],
+        )
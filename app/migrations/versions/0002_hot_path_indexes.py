@@ -0,0 +1,32 @@
+"""Composite indexes for listing by status and loading items in order.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+- `download (status, requested_at, id)` serves status-filtered listings in
+  keyset order and the worker's lookups of queued or running downloads.
+- `downloaditem (download_id, created_at)` serves loading a download's items
+  in recording order and replaces the single-column `download_id` index.
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_download_status_requested_at_id", "download", ["status", "requested_at", "id"])
+    op.create_index("ix_downloaditem_download_id_created_at", "downloaditem", ["download_id", "created_at"])
+    op.drop_index("ix_downloaditem_download_id", table_name="downloaditem")
+
+
+def downgrade() -> None:
+    op.create_index("ix_downloaditem_download_id", "downloaditem", ["download_id"])
+    op.drop_index("ix_downloaditem_download_id_created_at", table_name="downloaditem")
+    op.drop_index("ix_download_status_requested_at_id", table_name="download")
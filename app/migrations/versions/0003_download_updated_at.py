@@ -0,0 +1,34 @@
+"""Track when each download last changed.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+Adds `download.updated_at`, filled for existing rows from the latest of their
+lifecycle timestamps, and a `(updated_at, id)` index for
+`GET /downloads/changes`.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("download", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE download SET updated_at = COALESCE(finished_at, started_at, requested_at)")
+    with op.batch_alter_table("download") as batch:
+        batch.alter_column("updated_at", existing_type=sa.DateTime(), nullable=False)
+    op.create_index("ix_download_updated_at_id", "download", ["updated_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_download_updated_at_id", table_name="download")
+    with op.batch_alter_table("download") as batch:
+        batch.drop_column("updated_at")
@@ -0,0 +1,48 @@
+"""Number download changes in commit order.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+Adds `download.change_seq`, numbered for existing rows in `(updated_at, id)`
+order, and the single-row `changecounter` table that hands out later numbers.
+The `(updated_at, id)` index used by `GET /downloads/changes` is replaced by a
+`(change_seq, id)` one.
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("download", sa.Column("change_seq", sa.BigInteger(), nullable=True))
+    op.execute(
+        "UPDATE download SET change_seq = ("
+        "SELECT ranked.position FROM ("
+        "SELECT id, ROW_NUMBER() OVER (ORDER BY updated_at, id) AS position FROM download"
+        ") AS ranked WHERE ranked.id = download.id)"
+    )
+    op.create_index("ix_download_change_seq_id", "download", ["change_seq", "id"])
+    op.drop_index("ix_download_updated_at_id", table_name="download")
+    op.create_table(
+        "changecounter",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.execute("INSERT INTO changecounter (id, value) SELECT 1, COALESCE(MAX(change_seq), 0) FROM download")
+
+
+def downgrade() -> None:
+    op.drop_table("changecounter")
+    op.create_index("ix_download_updated_at_id", "download", ["updated_at", "id"])
+    op.drop_index("ix_download_change_seq_id", table_name="download")
+    with op.batch_alter_table("download") as batch:
+        batch.drop_column("change_seq")
@@ -1,4 +1,16 @@
 """Pydantic models and SQLModel ORM entities used by the service."""
 
-from .schemas import DownloadCreate, DownloadItemRead, DownloadRead, DownloadStatus  # noqa: F401
-
+from .schemas import (  # noqa: F401
+    BatchEntryStatus,
+    DownloadBatchCreate,
+    DownloadBatchEntryResult,
+    DownloadBatchRead,
+    DownloadChanges,
+    DownloadCreate,
+    DownloadItemRead,
+    DownloadPriorityUpdate,
+    DownloadRead,
+    DownloadStatus,
+    DownloadSummary,
+    DownloadTimings,
+)
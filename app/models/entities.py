@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from typing import List, Optional
 
-from sqlalchemy import Column, Enum as SAEnum, JSON, String
+from sqlalchemy import BigInteger, Column, Enum as SAEnum, Index, JSON, String, null
 from sqlmodel import Field, Relationship, SQLModel
 
 from app.models.schemas import DownloadStatus
@@ -11,6 +11,12 @@ from app.models.schemas import DownloadStatus
 class Download(SQLModel, table=True):
     """SQLModel entity representing a download job."""
 
+    __table_args__ = (
+        Index("ix_download_requested_at_id", "requested_at", "id"),
+        Index("ix_download_status_requested_at_id", "status", "requested_at", "id"),
+        Index("ix_download_change_seq_id", "change_seq", "id"),
+    )
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     status: DownloadStatus = Field(
         default=DownloadStatus.queued, sa_column=Column(SAEnum(DownloadStatus), nullable=False)
@@ -18,31 +24,51 @@ class Download(SQLModel, table=True):
     urls: List[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
     label: Optional[str] = Field(default=None, nullable=True)
     post_title: Optional[str] = Field(default=None, nullable=True)
+    priority: Optional[int] = Field(default=None, nullable=True)
     output_path: Optional[str] = Field(default=None, nullable=True)
     requested_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
     started_at: Optional[datetime] = Field(default=None, nullable=True)
     finished_at: Optional[datetime] = Field(default=None, nullable=True)
     failure_reason: Optional[str] = Field(default=None, nullable=True)
+    # Phase timing record of the latest finished attempt; see `app.profiling.PhaseTimer`.
+    timings: Optional[dict] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    # Bumped by every write to the download or its items; drives ETags.
+    updated_at: datetime = Field(
+        default_factory=datetime.utcnow,
+        nullable=False,
+        sa_column_kwargs={"default": datetime.utcnow, "onupdate": datetime.utcnow},
+    )
+    # Commit-ordered number of the latest change, which drives `GET /downloads/changes`. Every
+    # write clears it and the committing transaction numbers it from `ChangeCounter` (see
+    # `app.repositories.downloads`), so it is only ever NULL inside that transaction.
+    change_seq: Optional[int] = Field(default=None, sa_column=Column(BigInteger, nullable=True, onupdate=null()))
 
     items: List["DownloadItem"] = Relationship(
         back_populates="download",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan", "lazy": "selectin"},
+        sa_relationship_kwargs={
+            "cascade": "all, delete-orphan",
+            "lazy": "selectin",
+            "order_by": "DownloadItem.created_at",
+        },
     )
     url_entries: List["DownloadUrl"] = Relationship(
         back_populates="download",
-        sa_relationship_kwargs={"cascade": "all, delete-orphan", "lazy": "selectin"},
+        sa_relationship_kwargs={"cascade": "all, delete-orphan", "lazy": "select"},
     )
 
 
 class DownloadItem(SQLModel, table=True):
     """SQLModel entity for individual files produced by a download."""
 
+    __table_args__ = (Index("ix_downloaditem_download_id_created_at", "download_id", "created_at"),)
+
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
-    download_id: uuid.UUID = Field(foreign_key="download.id", nullable=False, index=True)
+    download_id: uuid.UUID = Field(foreign_key="download.id", nullable=False)
     filename: str
     relative_path: str
     file_size: Optional[int] = None
     content_type: Optional[str] = None
+    content_hash: Optional[str] = Field(default=None, sa_column=Column(String(64), nullable=True, index=True))
     created_at: datetime = Field(default_factory=datetime.utcnow, nullable=False)
 
     download: Optional[Download] = Relationship(back_populates="items")
@@ -54,5 +80,13 @@ class DownloadUrl(SQLModel, table=True):
     id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
     download_id: uuid.UUID = Field(foreign_key="download.id", nullable=False, index=True)
     url: str = Field(sa_column=Column(String(2048), nullable=False, index=True, unique=True))
+    url_hash: Optional[str] = Field(default=None, sa_column=Column(String(64), nullable=True, index=True))
 
     download: Optional[Download] = Relationship(back_populates="url_entries")
+
+
+class ChangeCounter(SQLModel, table=True):
+    """Single row holding the last `Download.change_seq` handed out."""
+
+    id: int = Field(default=1, primary_key=True)
+    value: int = Field(default=0, sa_column=Column(BigInteger, nullable=False))
@@ -1,10 +1,12 @@
 import uuid
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Union
 
 from pydantic import BaseModel, Field, HttpUrl
 
+DEFAULT_PRIORITY = 5
+
 
 class DownloadStatus(str, Enum):
     queued = "queued"
@@ -23,6 +25,35 @@ class DownloadCreate(BaseModel):
     )
 
 
+class DownloadPriorityUpdate(BaseModel):
+    priority: int = Field(..., ge=0, le=10, description="New priority; higher values are dequeued first.")
+
+
+class DownloadBatchCreate(BaseModel):
+    entries: List[Any] = Field(
+        ...,
+        min_length=1,
+        description="Download requests shaped like the `POST /downloads` body; each entry is validated separately.",
+    )
+
+
+class BatchEntryStatus(str, Enum):
+    created = "created"
+    existing = "existing"
+    rejected = "rejected"
+
+
+class DownloadBatchEntryResult(BaseModel):
+    index: int
+    status: BatchEntryStatus
+    download_id: Optional[uuid.UUID] = None
+    detail: Optional[str] = None
+
+
+class DownloadBatchRead(BaseModel):
+    results: List[DownloadBatchEntryResult] = Field(default_factory=list)
+
+
 class DownloadItemRead(BaseModel):
     id: uuid.UUID
     download_id: uuid.UUID
@@ -30,18 +61,69 @@ class DownloadItemRead(BaseModel):
     relative_path: str
     file_size: Optional[int] = None
     content_type: Optional[str] = None
+    content_hash: Optional[str] = None
     created_at: datetime
 
 
+class DownloadTimings(BaseModel):
+    queued: Optional[float] = Field(None, description="Seconds between the request and a worker starting the job.")
+    total: float = Field(..., description="Seconds the worker spent on the job.")
+    phases: Dict[str, float] = Field(
+        default_factory=dict, description="Seconds per phase of the job, in the order the phases first ran."
+    )
+    profile: Optional[str] = Field(None, description="Sampled profile written for this job, if it was slow enough.")
+
+
+class DownloadSummary(BaseModel):
+    id: uuid.UUID
+    status: DownloadStatus
+    urls: List[HttpUrl]
+    label: Optional[str] = None
+    post_title: Optional[str] = None
+    priority: int = DEFAULT_PRIORITY
+    output_path: Optional[str] = None
+    requested_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    failure_reason: Optional[str] = None
+    timings: Optional[DownloadTimings] = None
+    updated_at: Optional[datetime] = None
+    item_count: int = 0
+    total_bytes: int = 0
+
+
 class DownloadRead(BaseModel):
     id: uuid.UUID
     status: DownloadStatus
     urls: List[HttpUrl]
     label: Optional[str] = None
     post_title: Optional[str] = None
+    priority: int = DEFAULT_PRIORITY
     output_path: Optional[str] = None
     requested_at: datetime
     started_at: Optional[datetime] = None
     finished_at: Optional[datetime] = None
     failure_reason: Optional[str] = None
+    timings: Optional[DownloadTimings] = None
+    updated_at: Optional[datetime] = None
+    item_count: int = 0
+    total_bytes: int = 0
     items: List[DownloadItemRead] = Field(default_factory=list)
+
+
+class DownloadChanges(BaseModel):
+    downloads: List[Union[DownloadRead, DownloadSummary]] = Field(
+        default_factory=list, description="Downloads changed since the token, oldest change first."
+    )
+    next_since: str = Field(..., description="Token to pass as `since` on the next call.")
+    has_more: bool = Field(False, description="More changes are waiting; call again right away with `next_since`.")
+
+
+class NotificationStats(BaseModel):
+    connections: int = Field(..., description="WebSocket clients currently connected.")
+    queued: int = Field(..., description="Events waiting in all outbound queues.")
+    max_queue_depth: int = Field(..., description="Events waiting in the fullest outbound queue.")
+    sent: int = Field(..., description="Events delivered since the API started.")
+    dropped: int = Field(..., description="Queued events discarded to make room for newer ones.")
+    coalesced: int = Field(..., description="Queued events replaced by a newer event for the same download.")
+    overflow_disconnects: int = Field(..., description="Clients disconnected because their queue was full.")
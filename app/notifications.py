@@ -2,40 +2,287 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any, Iterable, Set
+import logging
+from collections import deque
+from contextlib import suppress
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
 
 from fastapi import WebSocket
+from redis import RedisError
+from redis.asyncio import Redis as AsyncRedis
+
+from app.config import settings
+from app.db import run_blocking
+
+logger = logging.getLogger(__name__)
+
+# Redis pub/sub channel carrying events published outside the API process.
+NOTIFICATION_CHANNEL = "download-notifications"
+
+# WebSocket close code asking a client that fell too far behind to reconnect later.
+WS_TRY_AGAIN_LATER = 1013
+
+# Sequence counter and replay buffer shared by every API process and worker.
+EVENT_SEQUENCE_KEY = "gdl:notifications:seq"
+EVENT_BUFFER_KEY = "gdl:notifications:events"
+
+# Numbers the event, keeps it in the buffer (a sorted set scored by sequence,
+# trimmed to the newest ARGV[2] entries) and publishes it, atomically, so
+# subscribers receive events in sequence order. ARGV[1] is a JSON object.
+_RECORD_SCRIPT = """
+local seq = redis.call('INCR', KEYS[1])
+local payload = '{"seq":' .. seq .. ',' .. string.sub(ARGV[1], 2)
+redis.call('ZADD', KEYS[2], seq, payload)
+redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -tonumber(ARGV[2]) - 1)
+redis.call('PUBLISH', ARGV[3], payload)
+return seq
+"""
+
+# Queue entries: (download id for coalescing, JSON payload, sequence number).
+QueuedEvent = Tuple[Optional[str], str, Optional[int]]
 
 
 class NotificationManager:
-    """Track active WebSocket connections and broadcast download events."""
+    """Track active WebSocket connections and fan download events out to them.
+
+    Every connection has a bounded outbound queue drained by its own task, so
+    `broadcast` never waits on a socket and one slow client cannot hold up the
+    others or the request that produced the event. When a queue is full,
+    `notification_overflow_policy` decides what gives.
+    """
+
+    def __init__(self, queue_size: Optional[int] = None, policy: Optional[str] = None) -> None:
+        self.queue_size = queue_size or settings.notification_queue_size
+        self.policy = policy or settings.notification_overflow_policy
+        self._subscribers: Dict[WebSocket, _Subscriber] = {}
+        self._closing: Set[asyncio.Task] = set()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.overflow_disconnects = 0
 
-    def __init__(self) -> None:
-        self._connections: Set[WebSocket] = set()
-        self._lock = asyncio.Lock()
+    async def connect(self, websocket: WebSocket, since: Optional[int] = None) -> None:
+        """Accept the connection and start its sender with the welcome message.
 
-    async def connect(self, websocket: WebSocket) -> None:
-        """Accept the connection and track the websocket instance."""
+        With `since`, the events numbered after it are replayed from the Redis
+        buffer first, or a `resync_required` event is sent when they are no
+        longer all available. Live events arriving meanwhile are held back and
+        deduplicated by sequence number.
+        """
         await websocket.accept()
-        async with self._lock:
-            self._connections.add(websocket)
+        subscriber = _Subscriber(self, websocket)
+        self._subscribers[websocket] = subscriber
+
+        try:
+            missed, latest = await run_blocking(read_events_since, since, self.queue_size)
+        except RedisError as exc:
+            logger.warning("Could not read the notification replay buffer: %s", exc)
+            missed, latest = None, None
+        initial: List[QueuedEvent] = [
+            (None, json.dumps({"type": "welcome", "message": "notifications-ready", "seq": latest}), None)
+        ]
+        if since is not None:
+            if missed is None:
+                initial.append((None, json.dumps({"type": "resync_required", "since": since, "seq": latest}), None))
+            else:
+                for payload in missed:
+                    event = json.loads(payload)
+                    initial.append((event.get("download_id"), payload, event.get("seq")))
+        subscriber.start(initial, after_seq=latest)
 
     async def disconnect(self, websocket: WebSocket) -> None:
-        """Remove a connection that has closed or failed."""
-        async with self._lock:
-            self._connections.discard(websocket)
+        """Forget a connection that has closed or failed and stop its sender."""
+        subscriber = self._subscribers.pop(websocket, None)
+        if subscriber is not None:
+            subscriber.stop()
 
-    async def broadcast(self, message: dict[str, Any]) -> None:
-        """Send a JSON message to every active connection."""
+    def broadcast(self, message: dict[str, Any]) -> None:
+        """Queue a JSON message for every active connection without waiting for delivery."""
         payload = json.dumps(message, default=_json_fallback)
-        async with self._lock:
-            targets: Iterable[WebSocket] = list(self._connections)
-
-        for websocket in targets:
-            try:
-                await websocket.send_text(payload)
-            except Exception:
-                await self.disconnect(websocket)
+        key = message.get("download_id")
+        seq = message.get("seq")
+        for websocket, subscriber in list(self._subscribers.items()):
+            if not subscriber.offer(key, payload, seq):
+                self.overflow_disconnects += 1
+                logger.warning("Disconnecting a WebSocket client whose notification queue is full")
+                self._subscribers.pop(websocket, None)
+                subscriber.stop(close_code=WS_TRY_AGAIN_LATER)
+
+    def stats(self) -> dict[str, int]:
+        """Counters and queue depths for monitoring the fan-out."""
+        depths = [len(subscriber.queue) for subscriber in self._subscribers.values()]
+        return {
+            "connections": len(depths),
+            "queued": sum(depths),
+            "max_queue_depth": max(depths, default=0),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "overflow_disconnects": self.overflow_disconnects,
+        }
+
+
+class _Subscriber:
+    """Outbound queue of one WebSocket connection and the task sending from it."""
+
+    def __init__(self, manager: NotificationManager, websocket: WebSocket) -> None:
+        self.manager = manager
+        self.websocket = websocket
+        self.queue: Deque[QueuedEvent] = deque()
+        # Sequenced events up to this number were part of the replay.
+        self.after_seq: Optional[int] = None
+        self._started = False
+        self._ready = asyncio.Event()
+        self._task = asyncio.create_task(self._drain())
+
+    def start(self, initial: List[QueuedEvent], after_seq: Optional[int]) -> None:
+        """Put `initial` ahead of the live events queued so far and begin sending."""
+        self.after_seq = after_seq
+        live = [entry for entry in self.queue if not self._replayed(entry[2])]
+        self.queue = deque(initial + live)
+        self._started = True
+        self._ready.set()
+
+    def offer(self, key: Optional[str], payload: str, seq: Optional[int] = None) -> bool:
+        """Queue `payload`, applying the overflow policy; False means the client must be disconnected."""
+        if self._replayed(seq):
+            return True
+        manager = self.manager
+        if len(self.queue) >= manager.queue_size:
+            if manager.policy == "disconnect":
+                return False
+            if manager.policy == "coalesce" and key is not None and self._remove_pending(key):
+                manager.coalesced += 1
+            else:
+                self.queue.popleft()
+                manager.dropped += 1
+        self.queue.append((key, payload, seq))
+        self._ready.set()
+        return True
+
+    def stop(self, close_code: Optional[int] = None) -> None:
+        self._task.cancel()
+        if close_code is not None:
+            closing = asyncio.create_task(self._close(close_code))
+            self.manager._closing.add(closing)
+            closing.add_done_callback(self.manager._closing.discard)
+
+    def _replayed(self, seq: Optional[int]) -> bool:
+        return seq is not None and self.after_seq is not None and seq <= self.after_seq
+
+    def _remove_pending(self, key: str) -> bool:
+        for index, (pending_key, _, _) in enumerate(self.queue):
+            if pending_key == key:
+                del self.queue[index]
+                return True
+        return False
+
+    async def _drain(self) -> None:
+        try:
+            while True:
+                if not self._started or not self.queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                _, payload, _ = self.queue.popleft()
+                await self.websocket.send_text(payload)
+                self.manager.sent += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            await self.manager.disconnect(self.websocket)
+
+    async def _close(self, code: int) -> None:
+        with suppress(Exception):
+            await self.websocket.close(code=code, reason="Notification queue overflow")
+
+
+def publish_event(message: dict[str, Any], *, source: Optional[str] = "worker") -> Optional[int]:
+    """Number an event, keep it for replay and publish it for every API process to broadcast.
+
+    Returns the event's sequence number. Publishing is best effort: a Redis
+    outage must not fail the job or request emitting it, so errors are
+    logged and `None` is returned.
+    """
+    from app.queue import get_redis
+
+    fields = {**message, "source": source} if source else dict(message)
+    payload = json.dumps(fields, default=_json_fallback)
+    connection = get_redis()
+    try:
+        seq = connection.register_script(_RECORD_SCRIPT)(
+            keys=[EVENT_SEQUENCE_KEY, EVENT_BUFFER_KEY],
+            args=[payload, settings.notification_replay_size, NOTIFICATION_CHANNEL],
+        )
+    except RedisError as exc:
+        logger.warning("Could not publish %s event: %s", message.get("type"), exc)
+        return None
+    return int(seq)
+
+
+async def announce(message: dict[str, Any]) -> None:
+    """Send an event raised by the API to the clients of every API process.
+
+    If Redis is unavailable, this process's clients still get the event,
+    without a sequence number.
+    """
+    if await run_blocking(publish_event, message, source=None) is None:
+        notification_manager.broadcast(message)
+
+
+def read_events_since(since: Optional[int], limit: int) -> Tuple[Optional[List[str]], int]:
+    """Return the buffered events numbered after `since` and the latest sequence number.
+
+    The list is `None` when the buffer no longer holds every event after
+    `since` (it was trimmed, more than `limit` were missed, or the counter
+    was reset), in which case the client has to resynchronize. Without
+    `since`, only the latest sequence number is read.
+    """
+    from app.queue import get_redis
+
+    connection = get_redis()
+    if since is None:
+        return [], int(connection.get(EVENT_SEQUENCE_KEY) or 0)
+    with connection.pipeline(transaction=True) as pipe:
+        pipe.get(EVENT_SEQUENCE_KEY)
+        pipe.zrange(EVENT_BUFFER_KEY, 0, 0, withscores=True)
+        pipe.zrangebyscore(EVENT_BUFFER_KEY, f"({since}", "+inf")
+        latest_raw, oldest, events = pipe.execute()
+    latest = int(latest_raw or 0)
+    if since == latest:
+        return [], latest
+    oldest_seq = int(oldest[0][1]) if oldest else latest + 1
+    if since > latest or oldest_seq > since + 1 or len(events) > limit:
+        return None, latest
+    return [event.decode() if isinstance(event, bytes) else event for event in events], latest
+
+
+async def relay_published_events(manager: NotificationManager) -> None:
+    """Forward events published on `NOTIFICATION_CHANNEL` to connected WebSockets until cancelled."""
+    delay = 1.0
+    while True:
+        client = AsyncRedis.from_url(
+            str(settings.redis_url), health_check_interval=settings.redis_health_check_interval
+        )
+        try:
+            async with client.pubsub(ignore_subscribe_messages=True) as pubsub:
+                await pubsub.subscribe(NOTIFICATION_CHANNEL)
+                delay = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    try:
+                        event = json.loads(message["data"])
+                    except (TypeError, ValueError):
+                        logger.warning("Dropping malformed notification: %r", message["data"])
+                        continue
+                    manager.broadcast(event)
+        except (RedisError, OSError) as exc:
+            logger.warning("Notification relay lost Redis (%s); reconnecting in %.0fs", exc, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+        finally:
+            await client.aclose()
 
 
 def _json_fallback(value: Any) -> str:
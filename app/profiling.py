@@ -0,0 +1,110 @@
+"""Phase timing and sampling profiles for download jobs.
+
+`PhaseTimer` splits a job's wall-clock time into named phases; the result
+is stored on the download as its `timings` record. `SamplingProfiler` is an
+opt-in (`GDL_JOB_PROFILE_ENABLED`) stack sampler for finding where slow jobs
+spend their time.
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+
+class PhaseTimer:
+    """Accumulate exclusive wall-clock seconds per named phase.
+
+    Phases nest: while an inner phase runs, the enclosing one is paused, so
+    the recorded phases never double count and add up to the time spent in
+    any of them. Not thread-safe; time one job from the thread running it.
+    """
+
+    def __init__(self) -> None:
+        self._seconds: Dict[str, float] = {}
+        self._stack: List[List] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        now = time.perf_counter()
+        if self._stack:
+            self._charge(self._stack[-1], now)
+        self._stack.append([name, now])
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self._charge(self._stack.pop(), end)
+            if self._stack:
+                self._stack[-1][1] = end
+
+    def switch(self, name: str) -> None:
+        """Charge the running phase so far, then continue timing it under `name`."""
+        if not self._stack:
+            return
+        self._charge(self._stack[-1], time.perf_counter())
+        self._stack[-1][0] = name
+
+    def current(self) -> Optional[str]:
+        return self._stack[-1][0] if self._stack else None
+
+    def as_dict(self) -> Dict[str, float]:
+        """Return seconds per phase, in the order phases first ran, rounded to milliseconds."""
+        return {name: round(seconds, 3) for name, seconds in self._seconds.items()}
+
+    def _charge(self, entry: List, until: float) -> None:
+        name, since = entry
+        self._seconds[name] = self._seconds.get(name, 0.0) + (until - since)
+        entry[1] = until
+
+
+class SamplingProfiler:
+    """Sample the stack of every thread at a fixed interval from a background thread.
+
+    Samples are aggregated as collapsed stacks (`thread;outer;...;inner count`),
+    the format read by flamegraph.pl, speedscope and similar viewers. Costs one
+    stack walk per thread per interval while running.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="job-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def write(self, path: Path) -> Path:
+        """Write the collapsed stacks to `path`, creating its directory."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        lines = [f"{stack} {count}\n" for stack, count in self.samples.most_common()]
+        path.write_text("".join(lines), encoding="utf-8")
+        return path
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                frames: List[str] = []
+                while frame is not None:
+                    code = frame.f_code
+                    frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                frames.append(names.get(ident, str(ident)))
+                self.samples[";".join(reversed(frames))] += 1
@@ -1,11 +1,147 @@
-from redis import Redis
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Union
+
+from redis import ConnectionPool, Redis
 from rq import Queue
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
 
 from app.config import settings
+from app.models.schemas import DEFAULT_PRIORITY
+
+HIGH_PRIORITY_QUEUE = "downloads-high"
+DEFAULT_QUEUE = "downloads"
+LOW_PRIORITY_QUEUE = "downloads-low"
+# Workers drain the tiers in this order.
+QUEUE_TIERS = (HIGH_PRIORITY_QUEUE, DEFAULT_QUEUE, LOW_PRIORITY_QUEUE)
+# Job meta key recording when a job was last moved to another tier, as a Unix timestamp.
+TIER_ENTERED_META = "tier_entered_at"
+
+_pool: Optional[ConnectionPool] = None
+
+
+def init_redis() -> Redis:
+    """Create the process-wide Redis connection pool if it does not exist yet."""
+    global _pool
+    if _pool is None:
+        _pool = ConnectionPool.from_url(
+            str(settings.redis_url),
+            max_connections=settings.redis_max_connections,
+            socket_timeout=settings.redis_socket_timeout,
+            socket_connect_timeout=settings.redis_socket_connect_timeout,
+            health_check_interval=settings.redis_health_check_interval,
+        )
+    return Redis(connection_pool=_pool)
+
+
+def get_redis() -> Redis:
+    """Return a client backed by the shared connection pool."""
+    return init_redis()
+
+
+def close_redis() -> None:
+    """Disconnect every pooled connection; the next `get_redis` call starts a new pool."""
+    global _pool
+    if _pool is not None:
+        _pool.disconnect()
+        _pool = None
+
+
+def get_queue(name: str = DEFAULT_QUEUE) -> Queue:
+    """Return an RQ queue using the shared Redis connection pool."""
+    return Queue(name, connection=get_redis())
+
+
+def get_queues() -> List[Queue]:
+    """Return every priority tier, highest first."""
+    connection = get_redis()
+    return [Queue(name, connection=connection) for name in QUEUE_TIERS]
+
+
+def queue_name_for(priority: Optional[int]) -> str:
+    """Map a 0-10 priority (higher is more urgent) onto a queue tier."""
+    value = DEFAULT_PRIORITY if priority is None else priority
+    if value >= 7:
+        return HIGH_PRIORITY_QUEUE
+    if value <= 3:
+        return LOW_PRIORITY_QUEUE
+    return DEFAULT_QUEUE
+
+
+def job_id_for(download_id: Union[uuid.UUID, str]) -> str:
+    """Return the deterministic RQ job id used for a download."""
+    return f"download-{download_id}"
+
+
+def fetch_download_job(download_id: Union[uuid.UUID, str], connection: Optional[Redis] = None) -> Optional[Job]:
+    """Return the RQ job of a download whichever tier it sits in, or `None`."""
+    try:
+        return Job.fetch(job_id_for(download_id), connection=connection or get_redis())
+    except NoSuchJobError:
+        return None
+
+
+def mark_tier_entered(job: Job) -> None:
+    """Restart the aging clock of `job`; saved with the job when it is next enqueued or scheduled."""
+    job.meta[TIER_ENTERED_META] = datetime.now(timezone.utc).timestamp()
+
+
+def promote_aged_jobs(
+    connection: Redis, max_age_seconds: int, *, batch_size: int = 100, high_limit: int = 10
+) -> int:
+    """Move jobs that waited longer than `max_age_seconds` in their tier up one tier so they cannot starve.
+
+    A job waits from its creation, or from the last time it changed tier, so
+    admission deferrals do not restart the clock and a job climbs at most one
+    tier per `max_age_seconds`. At most `high_limit` jobs age into the high
+    tier per call, which keeps explicitly urgent requests ahead of a backlog.
+    Each tier is scanned in full, `batch_size` jobs at a time.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+    # Default jobs first, so that a job promoted from the low tier is not moved twice.
+    promoted = _promote_tier(connection, DEFAULT_QUEUE, HIGH_PRIORITY_QUEUE, cutoff, batch_size, limit=high_limit)
+    promoted += _promote_tier(connection, LOW_PRIORITY_QUEUE, DEFAULT_QUEUE, cutoff, batch_size)
+    return promoted
+
 
+def _promote_tier(
+    connection: Redis,
+    source_name: str,
+    target_name: str,
+    cutoff: datetime,
+    batch_size: int,
+    *,
+    limit: Optional[int] = None,
+) -> int:
+    promoted = 0
+    source = Queue(source_name, connection=connection)
+    target = Queue(target_name, connection=connection)
+    offset = 0
+    while limit is None or promoted < limit:
+        job_ids = source.get_job_ids(offset, offset + batch_size - 1)
+        if not job_ids:
+            break
+        offset += len(job_ids)
+        for job in Job.fetch_many(job_ids, connection=connection):
+            if job is None or _tier_entered_at(job) > cutoff:
+                continue
+            # Only the process that removes the job re-enqueues it.
+            if connection.lrem(source.key, 1, job.id):
+                offset -= 1
+                mark_tier_entered(job)
+                target.enqueue_job(job)
+                promoted += 1
+                if limit is not None and promoted >= limit:
+                    break
+    return promoted
 
-def get_queue() -> Queue:
-    """Return the primary RQ queue using configured Redis connection."""
-    connection = Redis.from_url(str(settings.redis_url))
-    return Queue("downloads", connection=connection)
 
+def _tier_entered_at(job: Job) -> datetime:
+    entered = job.meta.get(TIER_ENTERED_META)
+    if entered is not None:
+        return datetime.fromtimestamp(entered, timezone.utc)
+    created_at = job.created_at
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return created_at
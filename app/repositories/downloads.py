@@ -2,12 +2,48 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import Iterable, List, Optional
+from itertools import islice
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
 
+from sqlalchemy import and_, delete, event, func, insert, or_, update
+from sqlalchemy.orm import noload, selectinload
 from sqlmodel import Session, select
 
-from app.models.entities import Download, DownloadItem, DownloadUrl
-from app.models.schemas import DownloadItemRead, DownloadRead, DownloadStatus
+from app.models.entities import ChangeCounter, Download, DownloadItem, DownloadUrl
+from app.models.schemas import (
+    DEFAULT_PRIORITY,
+    DownloadItemRead,
+    DownloadRead,
+    DownloadStatus,
+)
+from app.services.urls import url_hash
+
+PageCursor = Tuple[datetime, uuid.UUID]
+# Position in the change feed: `(change_seq, id)` of the last download returned.
+ChangeToken = Tuple[int, uuid.UUID]
+
+# Rows per `INSERT` when recording download items; keeps statements well under
+# SQLite's bound-parameter limit.
+ITEM_INSERT_CHUNK_SIZE = 500
+
+@event.listens_for(Session, "before_commit")
+def _number_changes(session: Session) -> None:
+    """Give the downloads this transaction wrote the next `change_seq`, just before it commits.
+
+    Writes clear `change_seq`, so the rows to number are the ones still NULL.
+    Bumping `ChangeCounter` locks its row (or, on SQLite, the database) until
+    the commit, so numbers become visible in the order they were handed out
+    and a reader paging by `change_seq` never has a smaller one appear behind
+    it. Transactions that wrote no download skip the counter.
+    """
+    session.flush()
+    table = Download.__table__
+    if session.exec(select(table.c.id).where(table.c.change_seq.is_(None)).limit(1)).first() is None:
+        return
+    counter = ChangeCounter.__table__
+    session.exec(update(counter).where(counter.c.id == 1).values(value=counter.c.value + 1))
+    next_seq = select(counter.c.value).where(counter.c.id == 1).scalar_subquery()
+    session.exec(update(table).where(table.c.change_seq.is_(None)).values(change_seq=next_seq))
 
 
 class DownloadRepository:
@@ -27,23 +63,78 @@ class DownloadRepository:
         label: Optional[str],
         post_title: Optional[str],
         requested_at: datetime,
+        priority: Optional[int] = None,
+        replacing: Optional[uuid.UUID] = None,
+        inherit_items: bool = False,
     ) -> DownloadRead:
+        """Insert a queued download, deleting the download `replacing` in the same transaction.
+
+        With `inherit_items`, the replaced download's items move to the new one
+        instead of being deleted; use it when both write to the same folder.
+        """
+        if replacing is not None:
+            self._release_urls([replacing])
         entity = Download(
             id=download_id,
             urls=urls,
             label=label,
             post_title=post_title,
+            priority=DEFAULT_PRIORITY if priority is None else priority,
             requested_at=requested_at,
             status=DownloadStatus.queued,
         )
         self.session.add(entity)
         self.session.flush()
         for url in urls:
-            self.session.add(DownloadUrl(download_id=download_id, url=url))
+            self.session.add(DownloadUrl(download_id=download_id, url=url, url_hash=url_hash(url)))
+        if replacing is not None:
+            self.session.flush()
+            self._delete_replaced([replacing], {replacing: download_id} if inherit_items else {})
         self.session.commit()
         self.session.refresh(entity)
         return self._to_read(entity)
 
+    def create_many(self, records: Sequence[dict], *, replacing: Sequence[uuid.UUID] = ()) -> int:
+        """Insert queued downloads in bulk, deleting `replacing` in the same transaction.
+
+        Each record provides `download_id`, `urls`, `label`, `post_title`,
+        `priority` and `requested_at`, and optionally `inherits`: one of
+        `replacing` whose items move to the new download rather than being
+        deleted. Nothing is read back; the number of inserted downloads is
+        returned.
+        """
+        if replacing:
+            self._release_urls(list(replacing))
+        if records:
+            self.session.exec(
+                insert(Download),
+                params=[
+                    {
+                        "id": record["download_id"],
+                        "urls": record["urls"],
+                        "label": record.get("label"),
+                        "post_title": record.get("post_title"),
+                        "priority": DEFAULT_PRIORITY if record.get("priority") is None else record["priority"],
+                        "requested_at": record["requested_at"],
+                        "status": DownloadStatus.queued,
+                    }
+                    for record in records
+                ],
+            )
+            self.session.exec(
+                insert(DownloadUrl),
+                params=[
+                    {"id": uuid.uuid4(), "download_id": record["download_id"], "url": url, "url_hash": url_hash(url)}
+                    for record in records
+                    for url in record["urls"]
+                ],
+            )
+        if replacing:
+            heirs = {record["inherits"]: record["download_id"] for record in records if record.get("inherits")}
+            self._delete_replaced(list(replacing), heirs)
+        self.session.commit()
+        return len(records)
+
     def get(self, download_id: uuid.UUID) -> Optional[DownloadRead]:
         entity = self.session.exec(select(Download).where(Download.id == download_id)).first()
         if entity is None:
@@ -53,38 +144,141 @@ class DownloadRepository:
     def get_entity(self, download_id: uuid.UUID) -> Optional[Download]:
         return self.session.exec(select(Download).where(Download.id == download_id)).first()
 
-    def list(self) -> List[DownloadRead]:
-        results = self.session.exec(select(Download).order_by(Download.requested_at.desc())).all()
-        return [self._to_read(item) for item in results]
+    def get_payload(self, download_id: uuid.UUID) -> Optional[dict]:
+        """Return a download as the plain dict `DownloadRead` serializes to, built from rows without validation."""
+        rows = self.session.execute(select(Download.__table__).where(Download.id == download_id)).mappings().all()
+        if not rows:
+            return None
+        return self._to_payloads(rows, include_items=True)[0]
 
-    def find_active_by_urls(self, urls: Iterable[str]) -> Optional[DownloadRead]:
-        for url in urls:
-            stmt = (
-                select(Download)
-                .join(DownloadUrl)
-                .where(DownloadUrl.url == url)
-                .where(Download.status != DownloadStatus.failed)
+    def list_ids_by_status(self, status: DownloadStatus) -> List[uuid.UUID]:
+        return list(self.session.exec(select(Download.id).where(Download.status == status)).all())
+
+    def list_page_payloads(
+        self,
+        *,
+        limit: int,
+        after: Optional[PageCursor] = None,
+        statuses: Optional[Sequence[DownloadStatus]] = None,
+        label: Optional[str] = None,
+        post_title: Optional[str] = None,
+        requested_from: Optional[datetime] = None,
+        requested_to: Optional[datetime] = None,
+        include_items: bool = True,
+    ) -> Tuple[List[dict], Optional[PageCursor]]:
+        """Return one page of downloads ordered by `(requested_at, id)` descending, as payload dicts.
+
+        Rows are turned into the plain dicts `DownloadRead` (or, without items,
+        `DownloadSummary`) serializes to, without validation, for direct
+        encoding. `after` is the cursor of the last row of the previous page.
+        The second element of the result is the cursor for the next page, or
+        `None` when the listing is exhausted.
+        """
+        stmt = self._page_statement(
+            select(Download.__table__),
+            limit=limit,
+            after=after,
+            statuses=statuses,
+            label=label,
+            post_title=post_title,
+            requested_from=requested_from,
+            requested_to=requested_to,
+        )
+        rows = self.session.execute(stmt).mappings().all()
+        next_cursor: Optional[PageCursor] = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]["requested_at"], rows[-1]["id"])
+        return self._to_payloads(rows, include_items=include_items), next_cursor
+
+    def list_page_versions(
+        self,
+        *,
+        limit: int,
+        after: Optional[PageCursor] = None,
+        statuses: Optional[Sequence[DownloadStatus]] = None,
+        label: Optional[str] = None,
+        post_title: Optional[str] = None,
+        requested_from: Optional[datetime] = None,
+        requested_to: Optional[datetime] = None,
+    ) -> Tuple[List[Tuple[uuid.UUID, datetime]], Optional[PageCursor]]:
+        """Return `(id, updated_at)` for the page `list_page_payloads` would return, plus its next cursor.
+
+        Reads only the `download` table, so callers can tell whether a page
+        changed without loading it.
+        """
+        stmt = self._page_statement(
+            select(Download.id, Download.updated_at, Download.requested_at),
+            limit=limit,
+            after=after,
+            statuses=statuses,
+            label=label,
+            post_title=post_title,
+            requested_from=requested_from,
+            requested_to=requested_to,
+        )
+        rows = list(self.session.exec(stmt).all())
+        next_cursor: Optional[PageCursor] = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1].requested_at, rows[-1].id)
+        return [(row.id, row.updated_at) for row in rows], next_cursor
+
+    def get_updated_at(self, download_id: uuid.UUID) -> Optional[datetime]:
+        """Return when a download last changed, or `None` if it does not exist."""
+        return self.session.exec(select(Download.updated_at).where(Download.id == download_id)).first()
+
+    def list_changes(
+        self,
+        *,
+        limit: int,
+        after: Optional[ChangeToken] = None,
+        include_items: bool = True,
+    ) -> Tuple[List[dict], ChangeToken, bool]:
+        """Return downloads changed after `after` in `(change_seq, id)` order, as payload dicts.
+
+        `change_seq` is assigned in commit order, so nothing committed later can
+        sort before the returned token. The result carries the token for the
+        next call and whether more changes are waiting.
+        """
+        after_seq, after_id = after if after is not None else (0, uuid.UUID(int=0))
+        stmt = (
+            select(Download.__table__)
+            .where(
+                or_(
+                    Download.change_seq > after_seq,
+                    and_(Download.change_seq == after_seq, Download.id > after_id),
+                )
             )
-            entity = self.session.exec(stmt).first()
-            if entity:
-                return self._to_read(entity)
-        return None
+            .order_by(Download.change_seq, Download.id)
+            .limit(limit + 1)
+        )
 
-    def find_by_urls(self, urls: Iterable[str]) -> Optional[DownloadRead]:
-        for url in urls:
-            stmt = select(Download).join(DownloadUrl).where(DownloadUrl.url == url)
-            entity = self.session.exec(stmt).first()
-            if entity:
-                return self._to_read(entity)
-        return None
+        rows = self.session.execute(stmt).mappings().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        token = (rows[-1]["change_seq"], rows[-1]["id"]) if rows else (after_seq, after_id)
+        return self._to_payloads(rows, include_items=include_items), token, has_more
 
-    def find_failed_by_urls(self, urls: Iterable[str]) -> Optional[Download]:
-        for url in urls:
-            stmt = select(Download).join(DownloadUrl).where(DownloadUrl.url == url)
-            entity = self.session.exec(stmt).first()
-            if entity and entity.status == DownloadStatus.failed:
-                return entity
-        return None
+    def find_duplicates(self, urls: Iterable[str]) -> Tuple[Optional[DownloadRead], Optional[Download]]:
+        """Return the first active and the first failed download sharing a canonical URL with `urls`.
+
+        Matches are loaded without their items; only the active download that
+        is returned is reloaded with its items, in two more queries. The failed download
+        comes back without items.
+        """
+        matches = self._match_urls(urls)
+        active = next((entity for entity in matches if entity.status != DownloadStatus.failed), None)
+        failed = next((entity for entity in matches if entity.status == DownloadStatus.failed), None)
+        if active is None:
+            return None, failed
+        entity = self.session.exec(
+            select(Download)
+            .where(Download.id == active.id)
+            .options(selectinload(Download.items))
+            .execution_options(populate_existing=True)
+        ).one()
+        return self._to_read(entity), failed
 
     def delete(self, download_id: uuid.UUID) -> bool:
         entity = self.session.exec(select(Download).where(Download.id == download_id)).first()
@@ -99,16 +293,15 @@ class DownloadRepository:
         if entity is None:
             return None
 
-        items = self.session.exec(select(DownloadItem).where(DownloadItem.download_id == download_id)).all()
-        for item in items:
-            self.session.delete(item)
-
+        # Items stay: their files are still on disk and a new attempt only
+        # records what it adds or changes.
         entity.status = DownloadStatus.queued
         entity.requested_at = requested_at
         entity.started_at = None
         entity.finished_at = None
         entity.failure_reason = None
         entity.output_path = None
+        entity.timings = None
 
         self.session.add(entity)
         self.session.commit()
@@ -126,6 +319,16 @@ class DownloadRepository:
         self.session.refresh(entity)
         return self._to_read(entity)
 
+    def set_priority(self, download_id: uuid.UUID, priority: int) -> Optional[DownloadRead]:
+        entity = self.session.exec(select(Download).where(Download.id == download_id)).first()
+        if entity is None:
+            return None
+        entity.priority = priority
+        self.session.add(entity)
+        self.session.commit()
+        self.session.refresh(entity)
+        return self._to_read(entity)
+
     def update_status(
         self,
         download_id: uuid.UUID,
@@ -136,63 +339,309 @@ class DownloadRepository:
         failure_reason: Optional[str] = None,
         output_path: Optional[str] = None,
     ) -> Optional[DownloadRead]:
-        entity = self.session.exec(select(Download).where(Download.id == download_id)).first()
-        if entity is None:
+        updated = self.set_status(
+            download_id,
+            status,
+            started_at=started_at,
+            finished_at=finished_at,
+            failure_reason=failure_reason,
+            output_path=output_path,
+        )
+        if not updated:
             return None
+        return self.get(download_id)
 
-        entity.status = status
+    def set_status(
+        self,
+        download_id: uuid.UUID,
+        status: DownloadStatus,
+        *,
+        started_at: Optional[datetime] = None,
+        finished_at: Optional[datetime] = None,
+        failure_reason: Optional[str] = None,
+        output_path: Optional[str] = None,
+        timings: Optional[dict] = None,
+        expected: Optional[DownloadStatus] = None,
+        commit: bool = True,
+    ) -> bool:
+        """Apply a status transition without loading the download or its items.
+
+        Returns whether the download exists, and with `expected`, whether it
+        was in that status; otherwise nothing changes. Use `update_status`
+        when the caller needs the resulting `DownloadRead`. With `commit=False`
+        the change joins the session's open transaction.
+        """
+        values: dict = {"status": status, "failure_reason": failure_reason}
         if started_at is not None:
-            entity.started_at = started_at
+            values["started_at"] = started_at
         if finished_at is not None:
-            entity.finished_at = finished_at
-        entity.failure_reason = failure_reason
+            values["finished_at"] = finished_at
         if output_path is not None:
-            entity.output_path = output_path
+            values["output_path"] = output_path
+        if timings is not None:
+            values["timings"] = timings
 
-        self.session.add(entity)
-        self.session.commit()
-        self.session.refresh(entity)
-        return self._to_read(entity)
+        stmt = update(Download).where(Download.id == download_id)
+        if expected is not None:
+            stmt = stmt.where(Download.status == expected)
+        result = self.session.exec(stmt.values(**values))
+        if commit:
+            self.session.commit()
+        return result.rowcount > 0
 
     def append_items(
-        self, download_id: uuid.UUID, items: Iterable[dict]
-    ) -> Optional[DownloadRead]:
-        entity = self.session.exec(select(Download).where(Download.id == download_id)).first()
-        if entity is None:
-            return None
+        self,
+        download_id: uuid.UUID,
+        items: Iterable[dict],
+        *,
+        commit: bool = True,
+        chunk_size: int = ITEM_INSERT_CHUNK_SIZE,
+    ) -> int:
+        """Insert `items` for a download with Core bulk inserts and return how many were written.
 
-        for item in items:
-            record = DownloadItem(
-                download_id=download_id,
-                filename=item["filename"],
-                relative_path=item["relative_path"],
-                file_size=item.get("file_size"),
-                content_type=item.get("content_type"),
-                created_at=item.get("created_at", datetime.utcnow()),
+        Rows go to the database `chunk_size` at a time and nothing is read
+        back, so this suits both the incremental batches a running job writes
+        and one large final batch. With `commit=False` the rows join the
+        session's open transaction for the caller to commit.
+        """
+        connection = self.session.connection()
+        statement = insert(DownloadItem.__table__)
+        rows = iter(items)
+        written = 0
+        while chunk := [
+            {
+                "id": uuid.uuid4(),
+                "download_id": download_id,
+                "filename": item["filename"],
+                "relative_path": item["relative_path"],
+                "file_size": item.get("file_size"),
+                "content_type": item.get("content_type"),
+                "content_hash": item.get("content_hash"),
+                "created_at": item.get("created_at") or datetime.utcnow(),
+            }
+            for item in islice(rows, chunk_size)
+        ]:
+            connection.execute(statement, chunk)
+            written += len(chunk)
+        if written:
+            connection.execute(
+                update(Download.__table__)
+                .where(Download.__table__.c.id == download_id)
+                .values(updated_at=datetime.utcnow())
             )
-            self.session.add(record)
+        if commit:
+            self.session.commit()
+        return written
+
+    def list_item_paths(self, download_id: uuid.UUID) -> Set[str]:
+        """Return the `relative_path` of every item already recorded for a download."""
+        statement = select(DownloadItem.relative_path).where(DownloadItem.download_id == download_id)
+        return set(self.session.exec(statement).all())
 
+    def list_unhashed_items(
+        self, *, after: Optional[uuid.UUID] = None, limit: int = 500
+    ) -> List[Tuple[uuid.UUID, str, str]]:
+        """Return `(item id, output path, relative path)` for items without a content hash, by id."""
+        statement = (
+            select(DownloadItem.id, Download.output_path, DownloadItem.relative_path)
+            .join(Download, Download.id == DownloadItem.download_id)
+            .where(DownloadItem.content_hash.is_(None), Download.output_path.is_not(None))
+            .order_by(DownloadItem.id)
+            .limit(limit)
+        )
+        if after is not None:
+            statement = statement.where(DownloadItem.id > after)
+        return list(self.session.exec(statement).all())
+
+    def set_item_hashes(self, hashes: Dict[uuid.UUID, str]) -> int:
+        """Store content hashes for existing items in one statement."""
+        if not hashes:
+            return 0
+        # ORM bulk UPDATE by primary key: one executemany, no objects loaded.
+        self.session.exec(
+            update(DownloadItem),
+            params=[{"id": item_id, "content_hash": digest} for item_id, digest in hashes.items()],
+        )
+        owners = select(DownloadItem.download_id).where(DownloadItem.id.in_(list(hashes)))
+        self.session.exec(
+            update(Download)
+            .where(Download.id.in_(owners))
+            .values(updated_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
         self.session.commit()
-        self.session.refresh(entity)
-        return self._to_read(entity)
+        return len(hashes)
+
+    def find_by_url_hashes(self, hashes: Iterable[str]) -> Dict[str, List[Download]]:
+        """Map each of `hashes` that is already stored to the downloads owning it, without loading items."""
+        unique_hashes = list(dict.fromkeys(hashes))
+        if not unique_hashes:
+            return {}
+        stmt = (
+            select(DownloadUrl.url_hash, Download)
+            .join(Download, Download.id == DownloadUrl.download_id)
+            .where(DownloadUrl.url_hash.in_(unique_hashes))
+            .options(noload(Download.items))
+        )
+        matches: Dict[str, List[Download]] = {}
+        for digest, entity in self.session.exec(stmt).all():
+            matches.setdefault(digest, []).append(entity)
+        return matches
+
+    def _page_statement(
+        self,
+        stmt,
+        *,
+        limit: int,
+        after: Optional[PageCursor],
+        statuses: Optional[Sequence[DownloadStatus]],
+        label: Optional[str],
+        post_title: Optional[str],
+        requested_from: Optional[datetime],
+        requested_to: Optional[datetime],
+    ):
+        """Apply the listing filters, keyset cursor and order of `list_page_payloads` to `stmt`."""
+        if after is not None:
+            after_requested_at, after_id = after
+            stmt = stmt.where(
+                or_(
+                    Download.requested_at < after_requested_at,
+                    and_(Download.requested_at == after_requested_at, Download.id < after_id),
+                )
+            )
+        if statuses:
+            stmt = stmt.where(Download.status.in_(list(statuses)))
+        if label is not None:
+            stmt = stmt.where(Download.label == label)
+        if post_title is not None:
+            stmt = stmt.where(Download.post_title == post_title)
+        if requested_from is not None:
+            stmt = stmt.where(Download.requested_at >= requested_from)
+        if requested_to is not None:
+            stmt = stmt.where(Download.requested_at < requested_to)
+        return stmt.order_by(Download.requested_at.desc(), Download.id.desc()).limit(limit + 1)
+
+    def _match_urls(self, urls: Iterable[str]) -> List[Download]:
+        """Return downloads owning any of `urls`, ordered by the position of the first matching URL."""
+        positions: dict[str, int] = {}
+        for position, url in enumerate(urls):
+            positions.setdefault(url_hash(url), position)
+        if not positions:
+            return []
+
+        stmt = (
+            select(DownloadUrl.url_hash, Download)
+            .join(Download, Download.id == DownloadUrl.download_id)
+            .where(DownloadUrl.url_hash.in_(list(positions)))
+            .options(noload(Download.items))
+        )
+        rows = sorted(self.session.exec(stmt).all(), key=lambda row: positions[row[0]])
+        matches: dict[uuid.UUID, Download] = {}
+        for _, entity in rows:
+            matches.setdefault(entity.id, entity)
+        return list(matches.values())
+
+    def _release_urls(self, download_ids: Sequence[uuid.UUID]) -> None:
+        """Delete the URL rows of downloads about to be replaced, so their successors can claim the URLs."""
+        self.session.exec(delete(DownloadUrl).where(DownloadUrl.download_id.in_(download_ids)))
+
+    def _delete_replaced(self, download_ids: Sequence[uuid.UUID], heirs: Mapping[uuid.UUID, uuid.UUID]) -> None:
+        """Delete replaced downloads, first moving the items of those in `heirs` to their successor."""
+        for old_id, new_id in heirs.items():
+            self.session.exec(
+                update(DownloadItem).where(DownloadItem.download_id == old_id).values(download_id=new_id)
+            )
+        self.session.exec(delete(DownloadItem).where(DownloadItem.download_id.in_(download_ids)))
+        self.session.exec(delete(Download).where(Download.id.in_(download_ids)))
 
     # ---------------------------------------------------------------------
     # Mapping helpers
     # ---------------------------------------------------------------------
+    def _item_stats(self, download_ids: Sequence[uuid.UUID]) -> Dict[uuid.UUID, Tuple[int, int]]:
+        """Return `(item count, total bytes)` per download that has items."""
+        if not download_ids:
+            return {}
+        stats_stmt = (
+            select(
+                DownloadItem.download_id,
+                func.count(DownloadItem.id),
+                func.coalesce(func.sum(DownloadItem.file_size), 0),
+            )
+            .where(DownloadItem.download_id.in_(list(download_ids)))
+            .group_by(DownloadItem.download_id)
+        )
+        return {
+            download_id: (item_count, total_bytes)
+            for download_id, item_count, total_bytes in self.session.exec(stats_stmt).all()
+        }
+
+    def _to_payloads(self, rows: Sequence[Mapping], *, include_items: bool) -> List[dict]:
+        """Build `DownloadRead` (or `DownloadSummary`) shaped dicts from `download` rows.
+
+        Stored values are already in their response form (URLs were
+        normalized on the way in), so nothing is validated. Items come from
+        one query over the composite `(download_id, created_at)` index.
+        """
+        ids = [row["id"] for row in rows]
+        items: Dict[uuid.UUID, List[dict]] = {}
+        stats: Dict[uuid.UUID, Tuple[int, int]] = {}
+        if include_items and ids:
+            item_rows = self.session.execute(
+                select(DownloadItem.__table__)
+                .where(DownloadItem.download_id.in_(ids))
+                .order_by(DownloadItem.download_id, DownloadItem.created_at)
+            ).mappings()
+            for item in item_rows:
+                items.setdefault(item["download_id"], []).append(dict(item))
+            for download_id, entries in items.items():
+                stats[download_id] = (len(entries), sum(entry["file_size"] or 0 for entry in entries))
+        elif ids:
+            stats = self._item_stats(ids)
+
+        payloads: List[dict] = []
+        for row in rows:
+            item_count, total_bytes = stats.get(row["id"], (0, 0))
+            payload = {
+                "id": row["id"],
+                "status": row["status"],
+                "urls": row["urls"],
+                "label": row["label"],
+                "post_title": row["post_title"],
+                "priority": DEFAULT_PRIORITY if row["priority"] is None else row["priority"],
+                "output_path": row["output_path"],
+                "requested_at": row["requested_at"],
+                "started_at": row["started_at"],
+                "finished_at": row["finished_at"],
+                "failure_reason": row["failure_reason"],
+                "timings": row["timings"],
+                "updated_at": row["updated_at"],
+                "item_count": item_count,
+                "total_bytes": total_bytes,
+            }
+            if include_items:
+                payload["items"] = items.get(row["id"], [])
+            payloads.append(payload)
+        return payloads
+
     def _to_read(self, entity: Download) -> DownloadRead:
-        items_stmt = select(DownloadItem).where(DownloadItem.download_id == entity.id)
-        items = self.session.exec(items_stmt).all()
+        # `Download.items` is loaded with `selectin`, so the items of every
+        # entity fetched by one statement arrive in a single extra query.
         return DownloadRead(
             id=entity.id,
             status=entity.status,
             urls=list(entity.urls),
             label=entity.label,
             post_title=entity.post_title,
+            priority=DEFAULT_PRIORITY if entity.priority is None else entity.priority,
             output_path=entity.output_path,
             requested_at=entity.requested_at,
             started_at=entity.started_at,
             finished_at=entity.finished_at,
             failure_reason=entity.failure_reason,
+            timings=entity.timings,
+            updated_at=entity.updated_at,
+            item_count=len(entity.items),
+            total_bytes=sum(item.file_size or 0 for item in entity.items),
             items=[
                 DownloadItemRead(
                     id=item.id,
@@ -201,8 +650,9 @@ class DownloadRepository:
                     relative_path=item.relative_path,
                     file_size=item.file_size,
                     content_type=item.content_type,
+                    content_hash=item.content_hash,
                     created_at=item.created_at,
                 )
-                for item in items
+                for item in entity.items
             ],
         )
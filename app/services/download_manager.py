@@ -1,46 +1,106 @@
 import json
+import logging
+import os
 import shlex
 import subprocess
 import uuid
 from pathlib import Path
-from typing import Iterable, List, Optional, Tuple
+from typing import TYPE_CHECKING, Callable, Iterable, List, Optional, Sequence, Tuple
 from urllib.parse import urlparse
 
 from app.config import settings
-from app.storage import FileSystemStorage
+from app.profiling import PhaseTimer
+from app.storage import FileStat, FileSystemStorage, Snapshot, changed_files, stat_file, take_snapshot
+
+if TYPE_CHECKING:
+    from app.services.gallery_dl_engine import InProcessEngine
+
+logger = logging.getLogger(__name__)
+
+# Archive files that were downloaded and files skipped because they already exist, so
+# that files fetched before the archive existed are recorded on their next run.
+ARCHIVE_EVENTS = "file,skip"
+
+# Called with (output_path, file, stat) for every new or changed file gallery-dl reports as finished.
+FileCallback = Callable[[Path, Path, FileStat], None]
 
 
 class DownloadResult:
-    def __init__(self, output_path: Path, files: List[Path]) -> None:
+    """Destination of a run and the files it added or changed there."""
+
+    def __init__(self, output_path: Path, files: Snapshot) -> None:
         self.output_path = output_path
         self.files = files
 
 
 class DownloadManager:
-    """Lightweight wrapper around the gallery-dl CLI."""
+    """Lightweight wrapper running gallery-dl, either as a CLI process or in-process."""
 
-    def __init__(self, storage_root: Optional[Path] = None, extra_args: Optional[List[str]] = None) -> None:
+    def __init__(
+        self,
+        storage_root: Optional[Path] = None,
+        extra_args: Optional[List[str]] = None,
+        engine: Optional[str] = None,
+    ) -> None:
         root = storage_root or settings.storage_root
         self.storage = FileSystemStorage(root)
         self.extra_args = (
             extra_args if extra_args is not None else self._parse_extra_args(settings.gallery_dl_extra_args)
         )
+        engine = engine or settings.download_engine
+        self.archive_path = self._resolve_archive_path(engine)
+        self.in_process: Optional["InProcessEngine"] = None
+        if engine == "inprocess":
+            from app.services.gallery_dl_engine import InProcessEngine
+
+            self.in_process = InProcessEngine(
+                settings.gallery_dl_config_path, self.extra_args, archive_path=self.archive_path
+            )
 
-    def run(self, download_id: uuid.UUID, urls: Iterable[str], folder_name: Optional[str] = None) -> DownloadResult:
+    def run(
+        self,
+        download_id: uuid.UUID,
+        urls: Iterable[str],
+        folder_name: Optional[str] = None,
+        on_file: Optional[FileCallback] = None,
+        timer: Optional[PhaseTimer] = None,
+    ) -> DownloadResult:
+        """Run gallery-dl for `urls`, reporting finished files to `on_file` as they appear.
+
+        With `timer`, the run is split into the phases `prepare` (destination
+        and snapshot), `startup` (until gallery-dl reports its first file),
+        `transfer` (the rest of the run) and `inventory` (the post-run scan).
+        Time spent inside `on_file` is left to the phases it records.
+        """
         urls = list(urls)
         if not urls:
             raise ValueError("At least one URL must be provided to DownloadManager.run")
+        timer = timer or PhaseTimer()
+        with timer.phase("prepare"):
+            destination, command = self._prepare(download_id, urls, folder_name)
+            # Destinations are shared by jobs with the same title and URL, so only
+            # files that differ from this snapshot belong to the current job.
+            before = take_snapshot(destination)
+        streamed: Snapshot = {}
+        report = self._reporter(destination, before, streamed, on_file, timer)
+        with timer.phase("startup"):
+            if self.in_process is not None:
+                self.in_process.run(urls, destination, report)
+            else:
+                self._stream(command, report)
+        with timer.phase("inventory"):
+            # Reported files keep the stat taken when they were reported, and files
+            # gallery-dl left alone are assumed unchanged, so only files it wrote
+            # without reporting them (e.g. post-processor output) are statted here.
+            files = changed_files(before, streamed)
+            files.update(take_snapshot(destination, known=before.keys() | streamed.keys()))
+        return DownloadResult(output_path=destination, files=files)
 
-        target_folder_name = folder_name or str(download_id)
-        safe_folder = self._sanitize_folder_name(target_folder_name)
-        base_folder = self.storage.resolve_job_path(safe_folder)
-
-        domain_folder, resource_folder = self._derive_subfolders(urls[0])
-        destination = base_folder
-        if domain_folder:
-            destination = destination / domain_folder
-        if resource_folder:
-            destination = destination / resource_folder
+    def _prepare(
+        self, download_id: uuid.UUID, urls: List[str], folder_name: Optional[str]
+    ) -> Tuple[Path, List[str]]:
+        """Create the destination folder and return it with the gallery-dl command line."""
+        destination = self.storage.root / destination_for(download_id, urls, folder_name)
         destination.mkdir(parents=True, exist_ok=True)
 
         command: List[str] = [
@@ -52,16 +112,90 @@ class DownloadManager:
         if settings.gallery_dl_config_path.exists():
             command.extend(["--config", str(settings.gallery_dl_config_path)])
 
+        if self.archive_path is not None:
+            command.extend(["--download-archive", str(self.archive_path), "-o", f"archive-event={ARCHIVE_EVENTS}"])
+
         if self.extra_args:
             command.extend(self.extra_args)
 
         command.extend(urls)
-        # TODO: capture progress and structured metadata once gallery-dl exposes hooks.
-        subprocess.run(command, check=True)
+        return destination, command
+
+    @staticmethod
+    def _reporter(
+        destination: Path,
+        before: Snapshot,
+        streamed: Snapshot,
+        on_file: Optional[FileCallback],
+        timer: PhaseTimer,
+    ) -> Callable[[Path], None]:
+        """Return a callback passing files below `destination` that differ from `before` to `on_file`.
+
+        Each reported file is statted once and stored in `streamed`. The first
+        reported file ends the `startup` phase of `timer`.
+        """
 
-        files = list(destination.rglob("*"))
-        relevant_files = [path for path in files if path.is_file()]
-        return DownloadResult(output_path=destination, files=relevant_files)
+        def report(path: Path) -> None:
+            if timer.current() == "startup":
+                timer.switch("transfer")
+            if not path.is_absolute() or not path.is_relative_to(destination):
+                return
+            current = stat_file(path)
+            if current is None:
+                return
+            streamed[path] = current
+            if on_file is not None and before.get(path) != current:
+                on_file(destination, path, current)
+
+        return report
+
+    def _stream(self, command: List[str], report: Callable[[Path], None]) -> None:
+        """Run the gallery-dl CLI and report each file as soon as it is printed to stdout.
+
+        gallery-dl prints the path of a file once it has been fully written
+        (prefixed with `# ` when it already existed); stderr is left attached
+        to the worker's log. Raises `CalledProcessError` on a non-zero exit.
+        """
+        process = subprocess.Popen(command, stdout=subprocess.PIPE)
+        assert process.stdout is not None
+        try:
+            for raw_line in process.stdout:
+                path = self._parse_output_line(raw_line)
+                if path is not None:
+                    report(path)
+        except BaseException:
+            # Job timeouts and failing callbacks must not leave gallery-dl running.
+            process.kill()
+            raise
+        finally:
+            process.stdout.close()
+            returncode = process.wait()
+        if returncode:
+            raise subprocess.CalledProcessError(returncode, command)
+
+    @staticmethod
+    def _parse_output_line(raw_line: bytes) -> Optional[Path]:
+        line = os.fsdecode(raw_line.rstrip(b"\r\n"))
+        if line.startswith("# "):
+            line = line[2:]
+        return Path(line) if line else None
+
+    def _resolve_archive_path(self, engine: str) -> Optional[Path]:
+        enabled = settings.download_archive_enabled
+        if enabled is None:
+            # Only the in-process engine links media archived by an earlier job
+            # into a new folder; the CLI skips it, leaving the folder without it.
+            enabled = engine == "inprocess"
+        if not enabled:
+            return None
+        if engine != "inprocess":
+            logger.warning(
+                "The download archive is enabled with the subprocess engine: media archived by an earlier "
+                "job is skipped, so reposts under a new title and retries of deleted files record nothing."
+            )
+        path = settings.download_archive_path or self.storage.root / ".gallery-dl" / "archive.sqlite3"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
 
     @staticmethod
     def _parse_extra_args(raw: Optional[str]) -> List[str]:
@@ -81,29 +215,52 @@ class DownloadManager:
             condensed = condensed[:100].rstrip("_")
         return condensed or "download"
 
-    def _derive_subfolders(self, url: str) -> Tuple[Optional[str], Optional[str]]:
+    @staticmethod
+    def _derive_subfolders(url: str) -> Tuple[Optional[str], Optional[str]]:
         parsed = urlparse(url)
-        hostname = parsed.hostname or "unknown"
-        domain_parts = hostname.split(".")
-        if len(domain_parts) > 1:
-            domain = domain_parts[-2]
-        else:
-            domain = domain_parts[0]
-        domain_folder = self._sanitize_folder_name(domain)
+        domain_folder = derive_domain(url)
 
         path_parts = [segment for segment in parsed.path.split("/") if segment]
         resource = path_parts[-1] if path_parts else None
-        resource_folder = self._sanitize_folder_name(resource) if resource else None
+        resource_folder = DownloadManager._sanitize_folder_name(resource) if resource else None
 
         return domain_folder, resource_folder
 
 
+def destination_for(download_id: uuid.UUID, urls: Sequence[str], folder_name: Optional[str] = None) -> Path:
+    """Return the folder, relative to the storage root, a job for `urls` downloads into.
+
+    The folder is named after `folder_name` (the post title) or else the
+    download id, then the site and resource of the first URL; the query string
+    plays no part.
+    """
+    destination = Path(DownloadManager._sanitize_folder_name(folder_name or str(download_id)))
+    domain_folder, resource_folder = DownloadManager._derive_subfolders(urls[0])
+    if domain_folder:
+        destination = destination / domain_folder
+    if resource_folder:
+        destination = destination / resource_folder
+    return destination
+
+
+def derive_domain(url: str) -> str:
+    """Return the sanitized site name (e.g. `pixeldrain`) a URL belongs to."""
+    hostname = urlparse(url).hostname or "unknown"
+    domain_parts = hostname.split(".")
+    if len(domain_parts) > 1:
+        domain = domain_parts[-2]
+    else:
+        domain = domain_parts[0]
+    return DownloadManager._sanitize_folder_name(domain)
+
+
 def output_manifest(result: DownloadResult) -> str:
     """Return a JSON representation of downloaded files."""
     payload = {
         "output_path": str(result.output_path),
         "files": [
-            {"path": str(path.relative_to(result.output_path)), "size": path.stat().st_size} for path in result.files
+            {"path": str(path.relative_to(result.output_path)), "size": stat.size}
+            for path, stat in result.files.items()
         ],
     }
     return json.dumps(payload, indent=2)
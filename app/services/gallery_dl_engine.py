@@ -0,0 +1,288 @@
+"""Run gallery-dl inside the worker process instead of spawning its CLI per job."""
+
+from __future__ import annotations
+
+import copy
+import logging
+import os
+import queue
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+from gallery_dl import archive, config, exception, extractor, job, option, output
+
+from app.services.download_manager import ARCHIVE_EVENTS
+
+logger = logging.getLogger(__name__)
+
+# Seconds an interrupted run waits for gallery-dl to reach a file boundary and stop.
+CANCEL_GRACE_SECONDS = 10.0
+
+# gallery-dl exit status bit for URLs no extractor supports.
+UNSUPPORTED_URL_STATUS = 64
+
+
+class GalleryDLError(RuntimeError):
+    """Raised when an in-process gallery-dl run finishes with a non-zero status."""
+
+    def __init__(self, status: int) -> None:
+        super().__init__(f"gallery-dl finished with exit status {status}")
+        self.status = status
+
+
+class InProcessEngine:
+    """Drive `gallery_dl.job.DownloadJob` in the current interpreter.
+
+    Extractor modules are imported and the config file is parsed once, when the
+    engine is created, so a forked RQ work horse starts with both warm.
+    gallery-dl keeps its configuration in module globals: every run resets it
+    from the parsed base config plus `extra_args`, and only one run may be
+    active per process, which matches RQ running one job per worker process.
+    """
+
+    def __init__(
+        self, config_path: Path, extra_args: Sequence[str] = (), *, archive_path: Optional[Path] = None
+    ) -> None:
+        extractor.extractors()
+        self.config_path = config_path
+        self.archive_path = archive_path
+        self.args = option.build_parser().parse_args(list(extra_args))
+        self._base_config: dict = {}
+        self._base_config_mtime: Optional[float] = None
+        self._load_base_config()
+
+    def run(self, urls: Sequence[str], destination: Path, report: Callable[[Path], None]) -> None:
+        """Download `urls` into `destination`, calling `report` with every finished or skipped file.
+
+        `report` runs on the calling thread. If that thread is interrupted (e.g.
+        by an RQ job timeout), gallery-dl is told to stop at the next file
+        boundary and the exception is re-raised.
+        """
+        self._configure(destination)
+        paths: "queue.Queue[Optional[Path]]" = queue.Queue()
+        cancelled = threading.Event()
+        outcome: List[object] = []
+        thread = threading.Thread(
+            target=self._download, args=(list(urls), paths, cancelled, outcome), name="gallery-dl", daemon=True
+        )
+        thread.start()
+        try:
+            while True:
+                try:
+                    path = paths.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if path is None:
+                    break
+                report(path)
+        except BaseException:
+            cancelled.set()
+            thread.join(CANCEL_GRACE_SECONDS)
+            if thread.is_alive():
+                logger.warning("gallery-dl did not stop within %.0fs of being cancelled", CANCEL_GRACE_SECONDS)
+            raise
+
+        result = outcome[0] if outcome else 1
+        if isinstance(result, BaseException):
+            raise result
+        if result:
+            raise GalleryDLError(int(result))
+
+    def _download(
+        self, urls: List[str], paths: "queue.Queue[Optional[Path]]", cancelled: threading.Event, outcome: List[object]
+    ) -> None:
+        # Always ends by putting None on `paths`, which tells `run` the thread is done.
+        status = 0
+        archived_files = _ArchivedFiles(self.archive_path) if self.archive_path is not None else None
+        try:
+            for url in urls:
+                try:
+                    status |= _ReportingJob(url, paths=paths, cancelled=cancelled, archived_files=archived_files).run()
+                except exception.NoExtractorError:
+                    logger.error("Unsupported URL '%s'", url)
+                    status |= UNSUPPORTED_URL_STATUS
+        except exception.TerminateExtraction:
+            status |= 1
+        except BaseException as exc:  # surfaced on the calling thread
+            outcome.append(exc)
+        else:
+            outcome.append(status)
+        finally:
+            if archived_files is not None:
+                archived_files.close()
+            paths.put(None)
+
+    def _load_base_config(self) -> None:
+        base: dict = {}
+        files = [str(self.config_path)] if self.config_path.exists() else []
+        files.extend(self.args.configs_extra or ())
+        if files:
+            config.load(files, conf=base)
+        self._base_config = base
+        self._base_config_mtime = self.config_path.stat().st_mtime if self.config_path.exists() else None
+
+    def _configure(self, destination: Path) -> None:
+        mtime = self.config_path.stat().st_mtime if self.config_path.exists() else None
+        if mtime != self._base_config_mtime:
+            self._load_base_config()
+
+        config.clear()
+        for key, value in copy.deepcopy(self._base_config).items():
+            config.set((), key, value)
+        if self.archive_path is not None:
+            config.set((), "archive", str(self.archive_path))
+            config.set((), "archive-event", ARCHIVE_EVENTS)
+        # Mirror the parts of gallery-dl's CLI handling that `extra_args` can use.
+        args = self.args
+        if args.filename:
+            config.set((), "filename", args.filename)
+        if args.directory is not None:
+            config.set((), "base-directory", args.directory)
+            config.set((), "directory", ())
+        if args.postprocessors:
+            config.set((), "postprocessors", args.postprocessors)
+        if args.options_pp:
+            config.set((), "postprocessor-options", args.options_pp)
+        for opts in args.options:
+            config.set(*opts)
+        config.set((), "base-directory", str(destination))
+
+
+class _ReportingJob(job.DownloadJob):
+    """`DownloadJob` whose output feeds a queue and which stops once cancelled.
+
+    Child jobs for queued URLs are created as `self.__class__(extr, self)` and
+    inherit the queue and cancel flag from their parent.
+
+    With a SQLite download archive, the job also remembers where each archived
+    file was stored. A file archived by an earlier job but missing from this
+    job's destination (e.g. a repost under another title) is hard-linked from
+    there instead of being skipped; if no stored copy is known, it is
+    downloaded again.
+    """
+
+    def __init__(
+        self,
+        url,
+        parent: Optional["_ReportingJob"] = None,
+        *,
+        paths: Optional["queue.Queue[Optional[Path]]"] = None,
+        cancelled: Optional[threading.Event] = None,
+        archived_files: Optional["_ArchivedFiles"] = None,
+    ) -> None:
+        job.DownloadJob.__init__(self, url, parent)
+        if parent is not None:
+            paths, cancelled = parent.out.paths, parent.out.cancelled
+            archived_files = parent.shared_archived_files
+        self.out = _QueueOutput(paths, cancelled)
+        self.shared_archived_files = archived_files
+        self.archived_files: Optional[_ArchivedFiles] = None
+
+    def initialize(self, kwdict=None):
+        job.DownloadJob.initialize(self, kwdict)
+        # Only the SQLite archive persists across jobs; the in-memory one starts empty.
+        if type(self.archive) is archive.DownloadArchive:
+            self.archived_files = self.shared_archived_files
+
+    def handle_url(self, url, kwdict):
+        self.out.check_cancelled()
+        if self.archived_files is None:
+            job.DownloadJob.handle_url(self, url, kwdict)
+            return
+        key = self._archive_key(kwdict)
+        if key is None or not self._archived_elsewhere(kwdict):
+            job.DownloadJob.handle_url(self, url, kwdict)
+        elif not self._link_archived(key):
+            current_archive, self.archive = self.archive, None
+            try:
+                job.DownloadJob.handle_url(self, url, kwdict)
+            finally:
+                self.archive = current_archive
+        if key is not None:
+            self._remember(key)
+
+    def _archive_key(self, kwdict) -> Optional[str]:
+        # The entry `DownloadArchive.check` and `add` use, taken before a download can alter `kwdict`.
+        self.pathfmt.set_filename(kwdict)
+        if not self.pathfmt.extension:
+            return None
+        return self.archive.keygen(kwdict)
+
+    def _archived_elsewhere(self, kwdict) -> bool:
+        if not self.archive.check(kwdict):
+            return False
+        self.pathfmt.build_path()
+        return not os.path.exists(self.pathfmt.realpath)
+
+    def _link_archived(self, key: str) -> bool:
+        source = self.archived_files.lookup(key)
+        if source is None or not source.is_file():
+            return False
+        target = Path(self.pathfmt.realpath)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.link(source, target)
+        except OSError:
+            shutil.copy2(source, target)
+        logger.info("Linked archived file %s from %s", target, source)
+        self.out.success(str(target))
+        return True
+
+    def _remember(self, key: str) -> None:
+        realpath = self.pathfmt.realpath
+        if realpath and os.path.isfile(realpath):
+            self.archived_files.record(key, realpath)
+
+    def handle_queue(self, url, kwdict):
+        self.out.check_cancelled()
+        return job.DownloadJob.handle_queue(self, url, kwdict)
+
+
+class _ArchivedFiles:
+    """Side table in the SQLite download archive mapping archive entries to stored paths.
+
+    Uses a connection of its own, opened like gallery-dl opens the archive
+    (autocommit, generous lock timeout), rather than reaching into gallery-dl's.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), timeout=60, check_same_thread=False, isolation_level=None)
+        self.cursor = self.connection.cursor()
+        self.cursor.execute("CREATE TABLE IF NOT EXISTS gdl_archived_file (entry TEXT PRIMARY KEY, path TEXT NOT NULL)")
+
+    def lookup(self, entry: str) -> Optional[Path]:
+        self.cursor.execute("SELECT path FROM gdl_archived_file WHERE entry=?", (entry,))
+        row = self.cursor.fetchone()
+        return Path(row[0]) if row else None
+
+    def record(self, entry: str, path: str) -> None:
+        self.cursor.execute("INSERT OR REPLACE INTO gdl_archived_file (entry, path) VALUES (?, ?)", (entry, path))
+
+    def close(self) -> None:
+        self.connection.close()
+
+
+class _QueueOutput(output.NullOutput):
+    def __init__(self, paths: "queue.Queue[Optional[Path]]", cancelled: threading.Event) -> None:
+        self.paths = paths
+        self.cancelled = cancelled
+
+    def check_cancelled(self) -> None:
+        if self.cancelled.is_set():
+            raise exception.TerminateExtraction()
+
+    def start(self, path):
+        self.check_cancelled()
+
+    def progress(self, bytes_total, bytes_downloaded, bytes_per_second):
+        self.check_cancelled()
+
+    def skip(self, path):
+        self.paths.put(Path(path))
+
+    def success(self, path):
+        self.paths.put(Path(path))
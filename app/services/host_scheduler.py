@@ -0,0 +1,116 @@
+"""Per-site admission control shared by every worker process."""
+
+from __future__ import annotations
+
+import time
+from typing import Optional
+
+from redis import Redis
+
+from app.config import HostLimit, settings
+
+# Returns "0" when the job may start, otherwise the number of seconds to wait.
+# Concurrency slots are leases in a sorted set scored by their expiry so that a
+# crashed worker cannot hold a slot forever; the rate limit is a token bucket.
+_ACQUIRE_SCRIPT = """
+local slots_key = KEYS[1]
+local bucket_key = KEYS[2]
+local now = tonumber(ARGV[1])
+local member = ARGV[2]
+local lease_expiry = tonumber(ARGV[3])
+local concurrency = tonumber(ARGV[4])
+local rate = tonumber(ARGV[5])
+local burst = tonumber(ARGV[6])
+local retry = tonumber(ARGV[7])
+
+redis.call('ZREMRANGEBYSCORE', slots_key, '-inf', now)
+if concurrency > 0 and not redis.call('ZSCORE', slots_key, member) then
+  if redis.call('ZCARD', slots_key) >= concurrency then
+    return tostring(retry)
+  end
+end
+
+if rate > 0 then
+  local state = redis.call('HMGET', bucket_key, 'tokens', 'ts')
+  local tokens = tonumber(state[1]) or burst
+  local ts = tonumber(state[2]) or now
+  tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+  if tokens < 1 then
+    return tostring((1 - tokens) / rate)
+  end
+  redis.call('HSET', bucket_key, 'tokens', tokens - 1, 'ts', now)
+  redis.call('EXPIRE', bucket_key, math.ceil(burst / rate) + 60)
+end
+
+redis.call('ZADD', slots_key, lease_expiry, member)
+redis.call('EXPIRE', slots_key, math.ceil(lease_expiry - now) + 60)
+return "0"
+"""
+
+
+class HostScheduler:
+    """Enforce per-site concurrency caps and job start rates through Redis."""
+
+    key_prefix = "gdl:host"
+
+    def __init__(self, connection: Redis) -> None:
+        self.connection = connection
+        self._acquire = connection.register_script(_ACQUIRE_SCRIPT)
+
+    def limits_for(self, domain: str) -> HostLimit:
+        override = settings.host_limits.get(domain)
+        return HostLimit(
+            concurrency=(
+                override.concurrency
+                if override is not None and override.concurrency is not None
+                else settings.host_concurrency
+            ),
+            jobs_per_minute=(
+                override.jobs_per_minute
+                if override is not None and override.jobs_per_minute is not None
+                else settings.host_jobs_per_minute
+            ),
+            burst=override.burst if override is not None else 1,
+        )
+
+    def acquire(self, domain: str, job_id: str, *, lease_seconds: Optional[int] = None) -> float:
+        """Try to claim a slot for `job_id`; return 0 on success or the seconds to wait.
+
+        The slot is leased for `lease_seconds` (default `host_lease_seconds`);
+        keep it with `refresh` while the job runs.
+        """
+        limits = self.limits_for(domain)
+        if not limits.concurrency and not limits.jobs_per_minute:
+            return 0.0
+        now = time.time()
+        wait = self._acquire(
+            keys=[self._slots_key(domain), self._bucket_key(domain)],
+            args=[
+                now,
+                job_id,
+                now + (lease_seconds or settings.host_lease_seconds),
+                limits.concurrency or 0,
+                (limits.jobs_per_minute or 0) / 60.0,
+                limits.burst,
+                settings.host_retry_seconds,
+            ],
+        )
+        return float(wait)
+
+    def refresh(self, domain: str, job_id: str, *, lease_seconds: Optional[int] = None) -> None:
+        """Extend the lease of the slot held by `job_id`, if it still holds one."""
+        lease = lease_seconds or settings.host_lease_seconds
+        slots_key = self._slots_key(domain)
+        with self.connection.pipeline() as pipeline:
+            pipeline.zadd(slots_key, {job_id: time.time() + lease}, xx=True)
+            pipeline.expire(slots_key, lease + 60)
+            pipeline.execute()
+
+    def release(self, domain: str, job_id: str) -> None:
+        self.connection.zrem(self._slots_key(domain), job_id)
+
+    def _slots_key(self, domain: str) -> str:
+        return f"{self.key_prefix}:{domain}:slots"
+
+    def _bucket_key(self, domain: str) -> str:
+        return f"{self.key_prefix}:{domain}:bucket"
@@ -0,0 +1,98 @@
+"""Canonical URL forms used to deduplicate submissions."""
+
+from __future__ import annotations
+
+import hashlib
+from typing import Callable, Dict, Iterable, List, Optional
+from urllib.parse import SplitResult, parse_qsl, urlencode, urlsplit, urlunsplit
+
+SiteRule = Callable[[SplitResult], SplitResult]
+
+TRACKING_PARAMS = frozenset({"fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "ref_src", "ref_url"})
+TRACKING_PREFIXES = ("utm_",)
+
+_site_rules: Dict[str, SiteRule] = {}
+
+
+def register_site_rule(*domains: str) -> Callable[[SiteRule], SiteRule]:
+    """Register a canonicalization rule applied to URLs on the given domains.
+
+    Rules receive the already normalized URL parts (lowercase https host without
+    `www.`, tracking parameters removed) and return the canonical parts. A rule
+    registered for `example.com` also applies to its subdomains.
+    """
+
+    def decorator(rule: SiteRule) -> SiteRule:
+        for domain in domains:
+            _site_rules[domain.lower()] = rule
+        return rule
+
+    return decorator
+
+
+def canonicalize_url(url: str) -> str:
+    """Return the canonical form of `url` used for duplicate detection."""
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    netloc = host
+    if parts.port and parts.port not in (80, 443):
+        netloc = f"{host}:{parts.port}"
+
+    query = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    path = parts.path.rstrip("/")
+
+    canonical = SplitResult("https", netloc, path, urlencode(sorted(query)), "")
+    rule = _find_site_rule(host)
+    if rule is not None:
+        canonical = rule(canonical)
+    return urlunsplit(canonical)
+
+
+def url_hash(url: str) -> str:
+    """Return the hex digest stored in `DownloadUrl.url_hash` for `url`."""
+    return hashlib.sha256(canonicalize_url(url).encode("utf-8")).hexdigest()
+
+
+def unique_urls(urls: Iterable[str]) -> List[str]:
+    """Drop URLs whose canonical form already appeared earlier in `urls`."""
+    seen = set()
+    result: List[str] = []
+    for url in urls:
+        digest = url_hash(url)
+        if digest in seen:
+            continue
+        seen.add(digest)
+        result.append(url)
+    return result
+
+
+def _find_site_rule(host: str) -> Optional[SiteRule]:
+    labels = host.split(".")
+    for index in range(len(labels) - 1):
+        rule = _site_rules.get(".".join(labels[index:]))
+        if rule is not None:
+            return rule
+    return None
+
+
+@register_site_rule("pixeldrain.com")
+def _pixeldrain(parts: SplitResult) -> SplitResult:
+    # `/api/file/<id>` and `/u/<id>` address the same upload.
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if len(segments) >= 3 and segments[:2] == ["api", "file"]:
+        return parts._replace(path=f"/u/{segments[2]}", query="")
+    if len(segments) >= 2 and segments[0] == "u":
+        return parts._replace(path=f"/u/{segments[1]}", query="")
+    return parts
+
+
+@register_site_rule("bunkr.si", "bunkr.la", "bunkr.is", "bunkr.ru", "bunkr.su", "bunkr.black", "bunkrr.su")
+def _bunkr(parts: SplitResult) -> SplitResult:
+    # Bunkr rotates between mirror domains that serve identical paths.
+    return parts._replace(netloc="bunkr.si")
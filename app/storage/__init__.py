@@ -1,4 +1,5 @@
 """Storage backends for persisting downloaded assets."""
 
+from .blobs import BlobStore  # noqa: F401
 from .filesystem import FileSystemStorage  # noqa: F401
-
+from .inventory import FileStat, Snapshot, changed_files, stat_file, take_snapshot  # noqa: F401
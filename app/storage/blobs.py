@@ -0,0 +1,141 @@
+"""Content-addressed blob store that keeps one copy of each distinct file."""
+
+from __future__ import annotations
+
+import errno
+import hashlib
+import logging
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Linux `FICLONE` ioctl, used to reflink on filesystems such as Btrfs and XFS.
+FICLONE = 0x40049409
+
+
+class BlobStore:
+    """Store files once under `root/<aa>/<bb>/<sha256>` and link them into the readable layout.
+
+    The first copy of some content becomes the blob; later copies are replaced
+    by hard links to it (or reflinks where hard links are not possible).
+    Blobs are made read-only so an in-place write through one of the linked
+    paths fails instead of changing every download sharing the content.
+    """
+
+    def __init__(self, root: Path, workers: int = 4) -> None:
+        self.root = root
+        self.workers = workers
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def blob_path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    @staticmethod
+    def hash_file(path: Path) -> str:
+        digest = hashlib.sha256()
+        with path.open("rb") as handle:
+            while chunk := handle.read(HASH_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def hash_files(self, paths: Iterable[Path]) -> Dict[Path, str]:
+        """Hash `paths` in a thread pool; files that disappeared are left out."""
+        paths = list(paths)
+        if not paths:
+            return {}
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(paths))) as pool:
+            digests = pool.map(self._try_hash, paths)
+            return {path: digest for path, digest in zip(paths, digests) if digest is not None}
+
+    def store(self, path: Path, digest: str) -> int:
+        """Back `path` by the blob for `digest` and return the number of bytes this freed."""
+        blob = self.blob_path(digest)
+        if not blob.exists():
+            blob.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                _clone(path, blob)
+            except FileExistsError:
+                pass  # another worker stored the same content in the meantime
+            else:
+                _make_read_only(blob)
+                return 0
+        if os.path.samefile(path, blob):
+            return 0
+
+        size = path.stat().st_size
+        staging = path.with_name(f".{path.name}.dedup")
+        staging.unlink(missing_ok=True)
+        _clone(blob, staging)
+        os.replace(staging, path)
+        return size
+
+    def store_files(self, paths: Iterable[Path]) -> Tuple[Dict[Path, str], int]:
+        """Hash and store `paths`; return their digests and the bytes freed.
+
+        A file that cannot be linked keeps its own copy but still gets a digest.
+        """
+        digests = self.hash_files(paths)
+        freed = 0
+        for path, digest in digests.items():
+            try:
+                freed += self.store(path, digest)
+            except OSError as exc:
+                logger.warning("Could not deduplicate %s: %s", path, exc)
+        return digests, freed
+
+    def prune(self) -> int:
+        """Delete blobs no longer hard-linked from any download and return how many were removed.
+
+        Reflinked blobs always look unreferenced; removing them only means the
+        next copy of that content becomes the blob again.
+        """
+        removed = 0
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                blob = Path(directory) / name
+                try:
+                    if blob.stat().st_nlink == 1:
+                        blob.unlink()
+                        removed += 1
+                except FileNotFoundError:
+                    continue
+        return removed
+
+    def _try_hash(self, path: Path) -> Optional[str]:
+        try:
+            return self.hash_file(path)
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+
+def _clone(source: Path, target: Path) -> None:
+    """Create `target` sharing `source`'s data, by hard link or else by reflink."""
+    try:
+        os.link(source, target)
+        return
+    except OSError as exc:
+        if exc.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK, errno.ENOTSUP):
+            raise
+        link_error = exc
+    try:
+        import fcntl
+    except ImportError:  # pragma: no cover - not available on Windows
+        raise link_error
+    with source.open("rb") as src, target.open("xb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        except OSError:
+            dst.close()
+            target.unlink()
+            raise link_error from None
+
+
+def _make_read_only(path: Path) -> None:
+    mode = path.stat().st_mode
+    path.chmod(mode & ~(stat.S_IWUSR | stat.S_IWGRP | stat.S_IWOTH))
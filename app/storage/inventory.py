@@ -0,0 +1,71 @@
+"""Directory snapshots used to find the files a download added or changed."""
+
+from __future__ import annotations
+
+import os
+import stat
+from pathlib import Path
+from typing import Container, Dict, NamedTuple, Optional
+
+# gallery-dl writes into `<name>.part` and renames the file once it is complete.
+PARTIAL_SUFFIX = ".part"
+
+
+class FileStat(NamedTuple):
+    """The part of a file's metadata used to tell whether it changed."""
+
+    size: int
+    mtime_ns: int
+
+    @classmethod
+    def from_stat(cls, result: os.stat_result) -> "FileStat":
+        return cls(result.st_size, result.st_mtime_ns)
+
+
+Snapshot = Dict[Path, FileStat]
+
+
+def take_snapshot(root: Path, known: Container[Path] = ()) -> Snapshot:
+    """Return every finished file below `root` with its size and mtime.
+
+    Walks the tree with `os.scandir`, so each file costs one `stat` call and
+    directories none beyond the listing itself. Files in `known` are left out
+    without being statted. A missing `root` is empty.
+    """
+    snapshot: Snapshot = {}
+    pending = [root]
+    while pending:
+        directory = pending.pop()
+        try:
+            entries = os.scandir(directory)
+        except (FileNotFoundError, NotADirectoryError):
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+                elif entry.is_file() and not entry.name.endswith(PARTIAL_SUFFIX):
+                    path = Path(entry.path)
+                    if path in known:
+                        continue
+                    try:
+                        snapshot[path] = FileStat.from_stat(entry.stat())
+                    except FileNotFoundError:
+                        continue
+    return snapshot
+
+
+def stat_file(path: Path) -> Optional[FileStat]:
+    """Return the `FileStat` of a regular file, or None if it does not exist."""
+    try:
+        result = path.stat()
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+    if not stat.S_ISREG(result.st_mode):
+        return None
+    return FileStat.from_stat(result)
+
+
+def changed_files(before: Snapshot, after: Snapshot) -> Snapshot:
+    """Return the files of `after` that are new or differ from `before`."""
+    return {path: current for path, current in after.items() if before.get(path) != current}
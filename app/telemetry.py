@@ -0,0 +1,331 @@
+"""Prometheus metrics for the API, the queues and the workers.
+
+The API records request latency in-process. Workers run every job in a
+forked work horse, so their metrics are accumulated in Redis hashes under
+`gdl:metrics:*` and read back, together with live queue depths, by the
+collector behind `GET /metrics`. Recording a worker metric never raises:
+losing a sample is preferable to failing a download.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from prometheus_client import CollectorRegistry, Histogram, ProcessCollector
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.registry import Collector
+from prometheus_client.utils import floatToGoString
+from redis.client import Pipeline
+from redis.exceptions import RedisError
+from rq.registry import ScheduledJobRegistry, StartedJobRegistry
+from rq.utils import utcparse
+
+from app.config import settings
+from app.notifications import notification_manager
+from app.queue import get_queues, get_redis
+
+logger = logging.getLogger(__name__)
+
+METRIC_KEY_PREFIX = "gdl:metrics:"
+MiB = 1024 * 1024
+
+registry = CollectorRegistry()
+ProcessCollector(registry=registry)
+
+REQUEST_DURATION = Histogram(
+    "gdl_http_request_duration_seconds",
+    "Time spent serving API requests, by route template.",
+    ["method", "route", "status"],
+    registry=registry,
+)
+
+
+class RedisCounter:
+    """A counter whose samples, written by any process, are summed in Redis."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.key = f"{METRIC_KEY_PREFIX}{name}"
+
+    def inc(self, pipeline: Pipeline, amount: float = 1.0, **labels: str) -> None:
+        pipeline.hincrbyfloat(self.key, _encode_labels(self.labelnames, labels), amount)
+
+    def family(self, fields: Dict[bytes, bytes]) -> CounterMetricFamily:
+        family = CounterMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for field, value in fields.items():
+            family.add_metric(json.loads(field), float(value))
+        return family
+
+
+class RedisHistogram:
+    """A histogram whose observations, made by any process, are accumulated in Redis.
+
+    Each observation increments one bucket and the sum in a single hash;
+    buckets are made cumulative, and counted, when collected.
+    """
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = (), *, buckets: Sequence[float]
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.key = f"{METRIC_KEY_PREFIX}{name}"
+
+    def observe(self, pipeline: Pipeline, value: float, **labels: str) -> None:
+        encoded = _encode_labels(self.labelnames, labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        pipeline.hincrby(self.key, f"b{index}:{encoded}", 1)
+        pipeline.hincrbyfloat(self.key, f"sum:{encoded}", value)
+
+    def family(self, fields: Dict[bytes, bytes]) -> HistogramMetricFamily:
+        counts: Dict[str, List[int]] = {}
+        sums: Dict[str, float] = {}
+        for raw_field, raw_value in fields.items():
+            part, encoded = raw_field.decode().split(":", 1)
+            if part == "sum":
+                sums[encoded] = float(raw_value)
+            else:
+                index = int(part[1:])
+                counts.setdefault(encoded, [0] * (len(self.buckets) + 1))[index] = int(raw_value)
+
+        family = HistogramMetricFamily(self.name, self.documentation, labels=self.labelnames)
+        for encoded, bucket_counts in counts.items():
+            cumulative = 0
+            buckets: List[Tuple[str, float]] = []
+            for bound, count in zip(self.buckets + (math.inf,), bucket_counts):
+                cumulative += count
+                buckets.append((floatToGoString(bound), cumulative))
+            family.add_metric(json.loads(encoded), buckets, sums.get(encoded, 0.0))
+        return family
+
+
+QUEUE_WAIT = RedisHistogram(
+    "gdl_queue_wait_seconds",
+    "Time from enqueueing a download job until a worker starts it, including site deferrals.",
+    ["queue"],
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 7200, 21600),
+)
+JOB_DURATION = RedisHistogram(
+    "gdl_job_duration_seconds",
+    "Time a worker spent on a download job, by outcome.",
+    ["outcome"],
+    buckets=(1, 5, 10, 30, 60, 120, 300, 600, 1800, 3600, 7200),
+)
+JOB_FILES = RedisHistogram(
+    "gdl_job_files",
+    "Files recorded per finished download job.",
+    buckets=(0, 1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000),
+)
+JOB_BYTES = RedisHistogram(
+    "gdl_job_bytes",
+    "Bytes recorded per finished download job.",
+    buckets=(MiB, 10 * MiB, 100 * MiB, 500 * MiB, 1024 * MiB, 5 * 1024 * MiB, 10 * 1024 * MiB, 50 * 1024 * MiB),
+)
+JOB_FAILURES = RedisCounter(
+    "gdl_job_failures_total",
+    "Failed download jobs, by exception type or worker failure.",
+    ["reason"],
+)
+DOMAIN_BYTES = RedisCounter("gdl_domain_bytes_total", "Bytes downloaded per site.", ["domain"])
+DOMAIN_FILES = RedisCounter("gdl_domain_files_total", "Files downloaded per site.", ["domain"])
+DOMAIN_SECONDS = RedisCounter(
+    "gdl_domain_transfer_seconds_total",
+    "Time running jobs spent producing the files counted in `gdl_domain_bytes_total`, per site.",
+    ["domain"],
+)
+
+WORKER_METRICS = (
+    QUEUE_WAIT,
+    JOB_DURATION,
+    JOB_FILES,
+    JOB_BYTES,
+    JOB_FAILURES,
+    DOMAIN_BYTES,
+    DOMAIN_FILES,
+    DOMAIN_SECONDS,
+)
+
+
+@contextmanager
+def worker_metrics() -> Iterator[Pipeline]:
+    """Yield a Redis pipeline for recording worker metrics, sent in one round trip on exit.
+
+    Redis errors are logged and swallowed. With
+    `GDL_METRICS_ENABLED=false` the pipeline is discarded.
+    """
+    pipeline = get_redis().pipeline(transaction=False)
+    try:
+        yield pipeline
+        if settings.metrics_enabled:
+            pipeline.execute()
+    except RedisError as exc:
+        logger.warning("Could not record worker metrics: %s", exc)
+    finally:
+        pipeline.reset()
+
+
+def record_queue_wait(queue_name: str, created_at: Optional[datetime]) -> None:
+    """Record how long a job waited between creation and the start of its execution."""
+    if created_at is None:
+        return
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    waited = (datetime.now(timezone.utc) - created_at).total_seconds()
+    with worker_metrics() as pipeline:
+        QUEUE_WAIT.observe(pipeline, max(waited, 0.0), queue=queue_name)
+
+
+def record_job(outcome: str, seconds: float, files: int, total_bytes: int, failure: Optional[str] = None) -> None:
+    """Record a finished job; `failure` is the reason label for failed jobs."""
+    with worker_metrics() as pipeline:
+        JOB_DURATION.observe(pipeline, seconds, outcome=outcome)
+        JOB_FILES.observe(pipeline, files)
+        JOB_BYTES.observe(pipeline, total_bytes)
+        if failure is not None:
+            JOB_FAILURES.inc(pipeline, reason=failure)
+
+
+def record_failure(reason: str) -> None:
+    """Count a job failed by the worker machinery rather than by the job itself."""
+    with worker_metrics() as pipeline:
+        JOB_FAILURES.inc(pipeline, reason=reason)
+
+
+class TransferMeter:
+    """Accumulate per-site throughput for one job as its files are recorded."""
+
+    def __init__(self, domain: str) -> None:
+        self.domain = domain
+        self._since = time.monotonic()
+
+    def add(self, files: int, total_bytes: int) -> None:
+        now = time.monotonic()
+        elapsed, self._since = now - self._since, now
+        with worker_metrics() as pipeline:
+            DOMAIN_FILES.inc(pipeline, files, domain=self.domain)
+            DOMAIN_BYTES.inc(pipeline, total_bytes, domain=self.domain)
+            DOMAIN_SECONDS.inc(pipeline, elapsed, domain=self.domain)
+
+
+class ServiceCollector(Collector):
+    """Expose queue depths and the metrics workers left in Redis at scrape time."""
+
+    def collect(self):
+        try:
+            yield from self._queue_families()
+            yield from self._worker_families()
+        except RedisError as exc:
+            logger.warning("Could not collect queue and worker metrics: %s", exc)
+        yield from self._notification_families()
+
+    def _queue_families(self):
+        depth = GaugeMetricFamily("gdl_queue_depth", "Jobs waiting in each queue tier.", labels=["queue"])
+        deferred = GaugeMetricFamily(
+            "gdl_queue_deferred", "Jobs scheduled to re-enter each queue tier later.", labels=["queue"]
+        )
+        running = GaugeMetricFamily("gdl_queue_running", "Jobs currently executing from each tier.", labels=["queue"])
+        oldest = GaugeMetricFamily(
+            "gdl_queue_oldest_job_age_seconds", "Age of the job at the head of each queue tier.", labels=["queue"]
+        )
+        queues = get_queues()
+        connection = queues[0].connection
+        with connection.pipeline(transaction=False) as pipeline:
+            for queue in queues:
+                pipeline.llen(queue.key)
+                pipeline.zcard(ScheduledJobRegistry(queue=queue).key)
+                pipeline.zcard(StartedJobRegistry(queue=queue).key)
+                pipeline.lindex(queue.key, 0)
+            replies = pipeline.execute()
+        heads: Dict[str, bytes] = {}
+        for queue, (waiting, scheduled, started, head) in zip(queues, _chunks(replies, 4)):
+            depth.add_metric([queue.name], waiting)
+            deferred.add_metric([queue.name], scheduled)
+            running.add_metric([queue.name], started)
+            if head is not None:
+                heads[queue.name] = head
+        if heads:
+            job_prefix = queues[0].job_class.redis_job_namespace_prefix
+            created = connection.pipeline(transaction=False)
+            for head in heads.values():
+                created.hget(job_prefix + head.decode(), "created_at")
+            now = datetime.now(timezone.utc)
+            for name, value in zip(heads, created.execute()):
+                if value:
+                    age = (now - utcparse(value.decode()).replace(tzinfo=timezone.utc)).total_seconds()
+                    oldest.add_metric([name], max(age, 0.0))
+        return [depth, deferred, running, oldest]
+
+    def _worker_families(self):
+        with get_redis().pipeline(transaction=False) as pipeline:
+            for metric in WORKER_METRICS:
+                pipeline.hgetall(metric.key)
+            replies = pipeline.execute()
+        return [metric.family(fields) for metric, fields in zip(WORKER_METRICS, replies)]
+
+    def _notification_families(self):
+        stats = notification_manager.stats()
+        yield GaugeMetricFamily(
+            "gdl_notification_connections", "WebSocket clients currently connected.", value=stats["connections"]
+        )
+        yield GaugeMetricFamily(
+            "gdl_notification_queued_events", "Events waiting in all WebSocket outbound queues.", value=stats["queued"]
+        )
+        for name, documentation in (
+            ("sent", "Events delivered to WebSocket clients."),
+            ("dropped", "Queued events discarded to make room for newer ones."),
+            ("coalesced", "Queued events replaced by a newer event for the same download."),
+            ("overflow_disconnects", "Clients disconnected because their queue was full."),
+        ):
+            yield CounterMetricFamily(f"gdl_notification_{name}", documentation, value=stats[name])
+
+
+registry.register(ServiceCollector())
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing HTTP requests into `gdl_http_request_duration_seconds`.
+
+    Requests are labelled with the matched route template, such as
+    `/downloads/{download_id}`, so ids do not multiply the series.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            REQUEST_DURATION.labels(scope["method"], route, str(status_code)).observe(time.perf_counter() - started)
+
+
+def _encode_labels(labelnames: Sequence[str], labels: Dict[str, str]) -> str:
+    return json.dumps([str(labels[name]) for name in labelnames], separators=(",", ":"))
+
+
+def _chunks(values: list, size: int):
+    return (values[index : index + size] for index in range(0, len(values), size))
@@ -2,29 +2,60 @@ from __future__ import annotations
 
 import logging
 import os
+import time
 import uuid
-from datetime import datetime
-from typing import Iterable, List, Optional
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, List, Optional, Set, Tuple
 
+from redis import Redis, RedisError
 from rq import SimpleWorker, Worker
+from rq.exceptions import NoSuchJobError
+from rq.job import Job
+from rq.worker_pool import WorkerData, WorkerPool
 
 from app.config import settings
-from app.db import init_db, session_scope
+from app.db import engine, init_db, session_scope
 from app.models.schemas import DownloadStatus
-from app.queue import get_queue
+from app.notifications import publish_event
+from app.profiling import PhaseTimer, SamplingProfiler
+from app.queue import close_redis, get_queues, job_id_for, promote_aged_jobs
 from app.repositories.downloads import DownloadRepository
-from app.services.download_manager import DownloadManager
+from app.services.download_manager import DownloadManager, derive_domain
+from app.services.host_scheduler import HostScheduler
+from app.storage import BlobStore, FileStat
+from app.telemetry import TransferMeter, record_failure, record_job, record_queue_wait
 
 logger = logging.getLogger(__name__)
 manager = DownloadManager(settings.storage_root)
+blob_store: Optional[BlobStore] = (
+    BlobStore(settings.dedup_store_path or settings.storage_root / ".blobs", workers=settings.dedup_hash_workers)
+    if settings.dedup_enabled
+    else None
+)
 
 
 def process_download(*, download_id: str, urls: Iterable[str], post_title: Optional[str] = None) -> None:
-    identifier = uuid.UUID(download_id)
-    download_urls = [str(url) for url in urls]
+    profiler = SamplingProfiler(settings.job_profile_interval_seconds) if settings.job_profile_enabled else None
+    if profiler is not None:
+        profiler.start()
+    try:
+        _run_download(uuid.UUID(download_id), [str(url) for url in urls], post_title, profiler)
+    finally:
+        if profiler is not None:
+            profiler.stop()
+
+
+def _run_download(
+    identifier: uuid.UUID, download_urls: List[str], post_title: Optional[str], profiler: Optional[SamplingProfiler]
+) -> None:
+    download_id = str(identifier)
+    job_started = time.monotonic()
+    timer = PhaseTimer()
     current_post_title: Optional[str] = post_title
+    label: Optional[str] = None
 
-    with session_scope() as session:
+    with timer.phase("claim"), session_scope() as session:
         repo = DownloadRepository(session)
         existing = repo.get_entity(identifier)
         if existing is None:
@@ -37,58 +68,447 @@ def process_download(*, download_id: str, urls: Iterable[str], post_title: Optio
             )
             existing = repo.get_entity(identifier)
         elif post_title and not existing.post_title:
+            # Committed together with the status change below.
             existing.post_title = post_title
             session.add(existing)
-            session.commit()
-            session.refresh(existing)
-        repo.update_status(identifier, DownloadStatus.running, started_at=datetime.utcnow())
         current_post_title = existing.post_title if existing else post_title
+        label = existing.label if existing else None
+        started_at = datetime.utcnow()
+        queued = round((started_at - existing.requested_at).total_seconds(), 3) if existing else None
+        # Claim only queued downloads: a leftover job of a cancelled or already
+        # running download must not overwrite its status.
+        if not repo.set_status(
+            identifier, DownloadStatus.running, started_at=started_at, expected=DownloadStatus.queued, commit=False
+        ):
+            logger.info("Skipping job of download %s: it is %s, not queued", download_id, existing.status.value)
+            session.rollback()
+            return
+        session.commit()
+        # Files recorded by an earlier attempt of a retried download are kept.
+        recorded = repo.list_item_paths(identifier)
+
+    event_context = {
+        "download_id": download_id,
+        "urls": download_urls,
+        "post_title": current_post_title,
+        "label": label,
+    }
+    with timer.phase("notify"):
+        publish_event({"type": "running", **event_context, "started_at": _isoformat(started_at)})
 
+    domain = derive_domain(download_urls[0]) if download_urls else "unknown"
+    recorder = ProgressRecorder(identifier, event_context, recorded, meter=TransferMeter(domain), timer=timer)
     try:
-        result = manager.run(identifier, download_urls, folder_name=current_post_title)
-        items_payload: List[dict] = [
-            {
-                "filename": path.name,
-                "relative_path": str(path.relative_to(result.output_path)),
-                "file_size": path.stat().st_size,
-                "content_type": None,
-                "created_at": datetime.utcnow(),
-            }
-            for path in result.files
-        ]
+        result = manager.run(
+            identifier, download_urls, folder_name=current_post_title, on_file=recorder.add, timer=timer
+        )
+        # Pick up anything gallery-dl did not print, e.g. files written by post-processors.
+        with timer.phase("record"):
+            for path, stat in result.files.items():
+                recorder.add(result.output_path, path, stat)
+        finished_at = datetime.utcnow()
         with session_scope() as session:
             repo = DownloadRepository(session)
-            if items_payload:
-                repo.append_items(identifier, items_payload)
-            repo.update_status(
+            recorder.flush(notify=False, repo=repo)
+            timings = _timing_record(identifier, timer, job_started, queued, profiler)
+            repo.set_status(
                 identifier,
                 DownloadStatus.succeeded,
-                finished_at=datetime.utcnow(),
+                finished_at=finished_at,
                 output_path=str(result.output_path),
+                timings=timings,
             )
-        logger.info("Download %s finished with %d files", download_id, len(items_payload))
+        logger.info("Download %s finished with %d files", download_id, recorder.item_count)
+        record_job("succeeded", timings["total"], recorder.item_count, recorder.total_bytes)
+        publish_event(
+            {
+                "type": "succeeded",
+                **event_context,
+                "file_count": recorder.item_count,
+                "total_bytes": recorder.total_bytes,
+                "output_path": str(result.output_path),
+                "finished_at": _isoformat(finished_at),
+            }
+        )
     except Exception as exc:  # pragma: no cover - placeholder for comprehensive error handling
+        finished_at = datetime.utcnow()
         with session_scope() as session:
             repo = DownloadRepository(session)
-            repo.update_status(
+            # Keep whatever was fetched before the failure or timeout.
+            recorder.flush(notify=False, repo=repo)
+            timings = _timing_record(identifier, timer, job_started, queued, profiler)
+            repo.set_status(
                 identifier,
                 DownloadStatus.failed,
-                finished_at=datetime.utcnow(),
+                finished_at=finished_at,
                 failure_reason=str(exc),
+                timings=timings,
             )
         logger.exception("Download %s failed: %s", download_id, exc)
+        record_job(
+            "failed",
+            timings["total"],
+            recorder.item_count,
+            recorder.total_bytes,
+            failure=type(exc).__name__,
+        )
+        publish_event(
+            {
+                "type": "failed",
+                **event_context,
+                "file_count": recorder.item_count,
+                "total_bytes": recorder.total_bytes,
+                "failure_reason": str(exc),
+                "finished_at": _isoformat(finished_at),
+            }
+        )
         raise
 
 
+def _timing_record(
+    download_id: uuid.UUID,
+    timer: PhaseTimer,
+    job_started: float,
+    queued: Optional[float],
+    profiler: Optional[SamplingProfiler],
+) -> dict:
+    """Build the `timings` stored with a download, first writing its profile if the job ran long enough."""
+    total = time.monotonic() - job_started
+    profile: Optional[str] = None
+    if profiler is not None:
+        profiler.stop()
+        if total >= settings.job_profile_threshold_seconds:
+            directory = settings.job_profile_dir or settings.storage_root / ".profiles"
+            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+            try:
+                profile = str(profiler.write(directory / f"{download_id}-{stamp}.folded"))
+            except OSError as exc:
+                logger.warning("Could not write the profile of download %s: %s", download_id, exc)
+            else:
+                logger.info("Download %s took %.1fs; profile written to %s", download_id, total, profile)
+    return {"queued": queued, "total": round(total, 3), "phases": timer.as_dict(), "profile": profile}
+
+
+class ProgressRecorder:
+    """Record finished files as `DownloadItem` rows in small batches while a job runs.
+
+    A batch is written once `progress_batch_size` files are pending or
+    `progress_flush_seconds` have passed since the last write, and each write
+    publishes a `progress` event with the running totals. With deduplication
+    enabled, the batch is hashed and moved into the blob store first.
+    Paths in `recorded` are treated as already stored. Each write also feeds
+    `meter`, if given, with the batch's files and bytes, and is timed into the
+    `dedup`, `record` and `notify` phases of `timer`.
+    """
+
+    def __init__(
+        self,
+        download_id: uuid.UUID,
+        event_context: dict,
+        recorded: Set[str],
+        *,
+        meter: Optional[TransferMeter] = None,
+        timer: Optional[PhaseTimer] = None,
+    ) -> None:
+        self.download_id = download_id
+        self.event_context = event_context
+        self.meter = meter
+        self.timer = timer or PhaseTimer()
+        self._recorded = set(recorded)
+        self.item_count = 0
+        self.total_bytes = 0
+        self._pending: List[Tuple[Path, dict]] = []
+        self._last_flush = time.monotonic()
+
+    def add(self, output_path: Path, path: Path, stat: FileStat) -> None:
+        relative_path = str(path.relative_to(output_path))
+        if relative_path in self._recorded:
+            return
+        self._recorded.add(relative_path)
+        self._pending.append(
+            (
+                path,
+                {
+                    "filename": path.name,
+                    "relative_path": relative_path,
+                    "file_size": stat.size,
+                    "content_type": None,
+                    "created_at": datetime.utcnow(),
+                },
+            )
+        )
+        if (
+            len(self._pending) >= settings.progress_batch_size
+            or time.monotonic() - self._last_flush >= settings.progress_flush_seconds
+        ):
+            self.flush()
+
+    def flush(self, *, notify: bool = True, repo: Optional[DownloadRepository] = None) -> None:
+        """Write pending items; given `repo`, leave them in its transaction for the caller to commit."""
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, []
+        batch = [item for _, item in pending]
+        if blob_store is not None:
+            with self.timer.phase("dedup"):
+                digests, freed = blob_store.store_files(path for path, _ in pending)
+            for path, item in pending:
+                item["content_hash"] = digests.get(path)
+            if freed:
+                logger.info("Deduplicated %d bytes for download %s", freed, self.download_id)
+        with self.timer.phase("record"):
+            if repo is not None:
+                written = repo.append_items(self.download_id, batch, commit=False)
+            else:
+                with session_scope() as session:
+                    written = DownloadRepository(session).append_items(self.download_id, batch)
+        batch_bytes = sum(item["file_size"] or 0 for item in batch)
+        self.item_count += written
+        self.total_bytes += batch_bytes
+        with self.timer.phase("notify"):
+            if self.meter is not None:
+                self.meter.add(written, batch_bytes)
+            if notify:
+                publish_event(
+                    {
+                        "type": "progress",
+                        **self.event_context,
+                        "item_count": self.item_count,
+                        "total_bytes": self.total_bytes,
+                    }
+                )
+
+
+def _isoformat(value: datetime) -> str:
+    return value.isoformat() + "Z"
+
+
+class DownloadWorker(Worker):
+    """RQ worker applying per-site admission and keeping download records consistent.
+
+    Before a job runs, its site must have a free concurrency slot and a rate
+    token. Otherwise the job is scheduled again after a short delay and the
+    worker moves on, so jobs for other sites are not stuck behind it. The
+    slot is a short lease renewed with every heartbeat while the job runs.
+
+    Admission happens here, not in `process_download`: jobs taken by a plain
+    `rq worker` (or the `SimpleWorker` used on Windows) ignore the site limits.
+    """
+
+    def __init__(self, *args, **kwargs) -> None:
+        if settings.priority_aging_seconds:
+            # Maintenance also promotes aged jobs, so run it often enough for aging to be timely.
+            kwargs.setdefault("maintenance_interval", min(600, max(30, settings.priority_aging_seconds // 10)))
+        super().__init__(*args, **kwargs)
+        # Site and scheduler of the slot held by the running job, if it holds one.
+        self._slot: Optional[Tuple[str, HostScheduler]] = None
+
+    def run_maintenance_tasks(self) -> None:
+        super().run_maintenance_tasks()
+        if settings.priority_aging_seconds:
+            promoted = promote_aged_jobs(self.connection, settings.priority_aging_seconds)
+            if promoted:
+                self.log.info("Promoted %d aged jobs to a higher priority tier", promoted)
+
+    def execute_job(self, job, queue) -> None:
+        urls = (job.kwargs or {}).get("urls") or []
+        if not urls:
+            return super().execute_job(job, queue)
+
+        domain = derive_domain(str(urls[0]))
+        scheduler: Optional[HostScheduler] = HostScheduler(self.connection)
+        try:
+            wait = scheduler.acquire(domain, job.id, lease_seconds=self._lease_seconds())
+        except RedisError as exc:
+            # The job is already off the queue; dropping it here would leave its
+            # download queued for good, so run it without the site limits instead.
+            self.log.warning("Could not check the limits of site %s (%s); running job %s anyway", domain, exc, job.id)
+            scheduler, wait = None, 0.0
+        if wait > 0:
+            queue.schedule_job(job, datetime.now(timezone.utc) + timedelta(seconds=wait))
+            self.log.info("Site %s is busy; job %s deferred for %.1fs", domain, job.id, wait)
+            return None
+        record_queue_wait(queue.name, job.created_at)
+        if scheduler is not None:
+            self._slot = (domain, scheduler)
+        try:
+            return super().execute_job(job, queue)
+        finally:
+            self._slot = None
+            if scheduler is not None:
+                _release_host_slot(scheduler, domain, job.id)
+
+    def maintain_heartbeats(self, job) -> None:
+        super().maintain_heartbeats(job)
+        if self._slot is None:
+            return
+        domain, scheduler = self._slot
+        try:
+            scheduler.refresh(domain, job.id, lease_seconds=self._lease_seconds())
+        except RedisError as exc:
+            # The next heartbeat tries again; the lease outlasts a few missed ones.
+            self.log.warning("Could not renew the slot of job %s on site %s: %s", job.id, domain, exc)
+
+    def handle_work_horse_killed(self, job, retpid, ret_val, rusage) -> None:
+        super().handle_work_horse_killed(job, retpid, ret_val, rusage)
+        if self._slot is not None:
+            domain, scheduler = self._slot
+            _release_host_slot(scheduler, domain, job.id)
+        _fail_download_for_job(
+            job, f"Worker process terminated unexpectedly (exit status {ret_val}).", metric_reason="worker_killed"
+        )
+
+    def _lease_seconds(self) -> int:
+        # Heartbeats come every `job_monitoring_interval`; let a lease survive two missed ones.
+        return max(settings.host_lease_seconds, 3 * self.job_monitoring_interval)
+
+
+class DownloadWorkerPool(WorkerPool):
+    """Supervise `worker_concurrency` job slots, each one a `DownloadWorker` process.
+
+    RQ respawns slots that exit and forwards SIGINT/SIGTERM to every slot, which
+    finish their current job before stopping. Each slot registers and
+    heartbeats as a regular RQ worker.
+    """
+
+    def handle_dead_worker(self, worker_data: WorkerData) -> None:
+        if self.status != self.Status.STOPPED:
+            worker = DownloadWorker.find_by_key(
+                DownloadWorker.redis_worker_namespace_prefix + worker_data.name, connection=self.connection
+            )
+            job_id = worker.get_current_job_id() if worker is not None else None
+            if job_id is not None:
+                try:
+                    job = Job.fetch(job_id, connection=self.connection)
+                except NoSuchJobError:
+                    pass
+                else:
+                    urls = (job.kwargs or {}).get("urls") or []
+                    if urls:
+                        _release_host_slot(HostScheduler(self.connection), derive_domain(str(urls[0])), job.id)
+                    _fail_download_for_job(
+                        job, "Worker slot exited while the job was running.", metric_reason="slot_exited"
+                    )
+        super().handle_dead_worker(worker_data)
+
+
+def deduplicate_existing_items(*, batch_size: int = 500) -> dict:
+    """Move files recorded without a content hash into the blob store, then prune unused blobs."""
+    if blob_store is None:
+        raise RuntimeError("Deduplication is disabled; set GDL_DEDUP_ENABLED=true first.")
+
+    after: Optional[uuid.UUID] = None
+    hashed = freed = 0
+    while True:
+        with session_scope() as session:
+            rows = DownloadRepository(session).list_unhashed_items(after=after, limit=batch_size)
+        if not rows:
+            break
+        after = rows[-1][0]
+        paths = {item_id: Path(output_path) / relative_path for item_id, output_path, relative_path in rows}
+        digests, batch_freed = blob_store.store_files(paths.values())
+        hashes = {item_id: digests[path] for item_id, path in paths.items() if path in digests}
+        with session_scope() as session:
+            DownloadRepository(session).set_item_hashes(hashes)
+        hashed += len(hashes)
+        freed += batch_freed
+        logger.info("Deduplicated %d files so far, freeing %d bytes", hashed, freed)
+
+    pruned = blob_store.prune()
+    logger.info("Deduplication finished: %d files hashed, %d bytes freed, %d blobs pruned", hashed, freed, pruned)
+    return {"hashed": hashed, "bytes_freed": freed, "blobs_pruned": pruned}
+
+
+def fail_orphaned_downloads(connection: Redis) -> int:
+    """Mark `running` downloads that no live worker is executing as failed."""
+    active_job_ids = {worker.get_current_job_id() for worker in Worker.all(connection=connection)}
+    with session_scope() as session:
+        repo = DownloadRepository(session)
+        orphaned = [
+            download_id
+            for download_id in repo.list_ids_by_status(DownloadStatus.running)
+            if job_id_for(download_id) not in active_job_ids
+        ]
+        for download_id in orphaned:
+            repo.set_status(
+                download_id,
+                DownloadStatus.failed,
+                finished_at=datetime.utcnow(),
+                failure_reason="Worker stopped before the job finished.",
+            )
+    for download_id in orphaned:
+        logger.warning("Marked orphaned download %s as failed", download_id)
+        record_failure("orphaned")
+        _publish_failure(download_id, "Worker stopped before the job finished.")
+    return len(orphaned)
+
+
+def _release_host_slot(scheduler: HostScheduler, domain: str, job_id: str) -> None:
+    try:
+        scheduler.release(domain, job_id)
+    except RedisError as exc:
+        # The slot is freed when its lease runs out.
+        logger.warning("Could not release the slot of job %s on site %s: %s", job_id, domain, exc)
+
+
+def _fail_download_for_job(job: Job, reason: str, *, metric_reason: str) -> None:
+    download_id = (job.kwargs or {}).get("download_id")
+    if not download_id:
+        return
+    with session_scope() as session:
+        repo = DownloadRepository(session)
+        entity = repo.get_entity(uuid.UUID(download_id))
+        if entity is None or entity.status != DownloadStatus.running:
+            return
+        repo.set_status(entity.id, DownloadStatus.failed, finished_at=datetime.utcnow(), failure_reason=reason)
+    logger.warning("Download %s failed: %s", download_id, reason)
+    record_failure(metric_reason)
+    _publish_failure(uuid.UUID(download_id), reason)
+
+
+def _publish_failure(download_id: uuid.UUID, reason: str) -> None:
+    with session_scope() as session:
+        record = DownloadRepository(session).get_entity(download_id)
+        if record is None:
+            return
+        publish_event(
+            {
+                "type": "failed",
+                "download_id": str(download_id),
+                "urls": list(record.urls),
+                "post_title": record.post_title,
+                "label": record.label,
+                "failure_reason": reason,
+                "finished_at": _isoformat(record.finished_at or datetime.utcnow()),
+            }
+        )
+
+
 def run_worker() -> None:
     logging.basicConfig(level=logging.INFO)
     init_db()
-    queue = get_queue()
-    if os.name == "nt":
-        worker = SimpleWorker([queue], connection=queue.connection)
-    else:
-        worker = Worker([queue], connection=queue.connection)
-    worker.work(with_scheduler=True)
+    queues = get_queues()
+    connection = queues[0].connection
+    fail_orphaned_downloads(connection)
+    try:
+        if os.name == "nt":
+            # Runs jobs in-process without site admission; GDL_HOST_* limits do not apply.
+            SimpleWorker(queues, connection=connection).work(with_scheduler=True)
+        elif settings.worker_concurrency > 1:
+            # Slots are forked; do not let them inherit the supervisor's DB connections.
+            engine.dispose()
+            pool = DownloadWorkerPool(
+                queues,
+                connection=connection,
+                num_workers=settings.worker_concurrency,
+                worker_class=DownloadWorker,
+            )
+            pool.start()
+        else:
+            DownloadWorker(queues, connection=connection).work(with_scheduler=True)
+    finally:
+        close_redis()
 
 
 if __name__ == "__main__":
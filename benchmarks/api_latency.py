@@ -0,0 +1,164 @@
+"""Measure API latency while a simulated worker holds SQLite write locks.
+
+Run against a scratch SQLite database, since the benchmark inserts (and
+afterwards deletes) its own downloads:
+
+    GDL_DATABASE_URL=sqlite:////tmp/gdl-bench.db uv run python -m benchmarks.api_latency
+
+The API is served by uvicorn on a background thread and queried over HTTP
+by concurrent clients reading downloads, plus one client polling `/healthz`,
+which never touches the database. Another thread repeatedly takes an
+exclusive SQLite lock for `--hold-ms`, standing in for slow worker commits on
+a NAS. `--mode inline` runs the handlers' blocking work on the event loop
+instead of the thread pool, for comparison.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import socket
+import sqlite3
+import statistics
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List
+
+import httpx
+import uvicorn
+from sqlalchemy import delete
+
+import app.api.downloads as downloads_api
+from app.config import settings
+from app.db import engine, session_scope
+from app.main import app
+from app.models.entities import Download, DownloadItem, DownloadUrl
+from app.repositories.downloads import DownloadRepository
+
+LABEL = "benchmark-api-latency"
+
+
+async def _run_inline(func, *args, **kwargs):
+    return func(*args, **kwargs)
+
+
+def _seed(count: int) -> List[uuid.UUID]:
+    ids = [uuid.uuid4() for _ in range(count)]
+    with session_scope() as session:
+        DownloadRepository(session).create_many(
+            [
+                {
+                    "download_id": download_id,
+                    "urls": [f"https://example.com/benchmark/{download_id.hex}"],
+                    "label": LABEL,
+                    "post_title": None,
+                    "requested_at": datetime.utcnow(),
+                }
+                for download_id in ids
+            ]
+        )
+    return ids
+
+
+def _cleanup(ids: List[uuid.UUID]) -> None:
+    with session_scope() as session:
+        session.exec(delete(DownloadItem).where(DownloadItem.download_id.in_(ids)))
+        session.exec(delete(DownloadUrl).where(DownloadUrl.download_id.in_(ids)))
+        session.exec(delete(Download).where(Download.id.in_(ids)))
+        session.commit()
+
+
+def _hold_write_locks(path: str, hold: float, pause: float, stop: threading.Event) -> None:
+    connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+    try:
+        while not stop.is_set():
+            connection.execute("BEGIN EXCLUSIVE")
+            time.sleep(hold)
+            connection.execute("COMMIT")
+            time.sleep(pause)
+    finally:
+        connection.close()
+
+
+async def _client_loop(
+    client: httpx.AsyncClient, path: str, deadline: float, samples: List[float], headers: Dict[str, str]
+) -> None:
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get(path, headers=headers)
+        response.raise_for_status()
+        samples.append(time.perf_counter() - started)
+
+
+def _report(name: str, samples: List[float]) -> None:
+    if not samples:
+        print(f"{name:<10} n=0 (no request completed)")
+        return
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<10} n={len(samples):<6} mean={statistics.mean(samples) * 1000:.1f}ms "
+        f"p50={statistics.median(samples) * 1000:.1f}ms p99={p99 * 1000:.1f}ms"
+    )
+
+
+async def _measure(base_url: str, ids: List[uuid.UUID], args: argparse.Namespace) -> None:
+    headers = {"Authorization": f"Bearer {settings.api_token}"}
+    health: List[float] = []
+    detail: List[float] = []
+    deadline = time.perf_counter() + args.seconds
+    limits = httpx.Limits(max_connections=args.concurrency + 1)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        tasks = [
+            _client_loop(client, f"/downloads/{ids[index % len(ids)]}", deadline, detail, headers)
+            for index in range(args.concurrency)
+        ]
+        tasks.append(_client_loop(client, "/healthz", deadline, health, headers))
+        await asyncio.gather(*tasks)
+    _report("healthz", health)
+    _report("detail", detail)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("threadpool", "inline"), default="threadpool")
+    parser.add_argument("--seconds", type=float, default=10.0, help="Duration of the measurement.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients reading downloads.")
+    parser.add_argument("--hold-ms", type=float, default=100.0, help="How long each simulated commit locks.")
+    parser.add_argument("--pause-ms", type=float, default=250.0, help="Pause between simulated commits.")
+    args = parser.parse_args()
+
+    database = engine.url.database
+    if engine.url.get_backend_name() != "sqlite" or not database:
+        parser.error("the benchmark needs a file-backed SQLite GDL_DATABASE_URL")
+    if args.mode == "inline":
+        downloads_api.run_blocking = _run_inline
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    ids = _seed(50)
+    stop = threading.Event()
+    writer = threading.Thread(
+        target=_hold_write_locks, args=(database, args.hold_ms / 1000, args.pause_ms / 1000, stop), daemon=True
+    )
+    writer.start()
+    try:
+        print(f"mode={args.mode} hold={args.hold_ms:.0f}ms pause={args.pause_ms:.0f}ms clients={args.concurrency}")
+        asyncio.run(_measure(f"http://127.0.0.1:{port}", ids, args))
+    finally:
+        stop.set()
+        writer.join()
+        _cleanup(ids)
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare per-job overhead of the subprocess and in-process gallery-dl engines.
+
+Serves a small file from a local HTTP server and downloads it through
+`DownloadManager` once per job, so the timings are dominated by engine
+start-up rather than the network:
+
+    uv run python -m benchmarks.engine_overhead --jobs 50
+
+Files are written to a temporary directory that is removed afterwards.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from functools import partial
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List
+
+from app.services.download_manager import DownloadManager
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args) -> None:  # noqa: A002 - signature defined by the base class
+        pass
+
+
+def _measure(manager: DownloadManager, base_url: str, jobs: int) -> List[float]:
+    samples: List[float] = []
+    for index in range(jobs):
+        started = time.perf_counter()
+        result = manager.run(uuid.uuid4(), [f"{base_url}/image-{index}.jpg"])
+        samples.append(time.perf_counter() - started)
+        if not result.files:
+            raise RuntimeError(f"job {index} downloaded nothing")
+    return samples
+
+
+def _report(name: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<10} n={len(samples):<6} mean={statistics.mean(samples) * 1000:.1f}ms "
+        f"p50={statistics.median(samples) * 1000:.1f}ms p99={p99 * 1000:.1f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=30, help="Number of single-file jobs to run per engine.")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="Size in bytes of each served file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="gdl-bench-") as scratch:
+        served = Path(scratch) / "served"
+        served.mkdir()
+        payload = bytes(args.size)
+        for index in range(args.jobs):
+            (served / f"image-{index}.jpg").write_bytes(payload)
+
+        server = ThreadingHTTPServer(("127.0.0.1", 0), partial(_QuietHandler, directory=str(served)))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            for engine in ("subprocess", "inprocess"):
+                started = time.perf_counter()
+                manager = DownloadManager(Path(scratch) / engine, extra_args=[], engine=engine)
+                print(f"{engine:<10} setup={(time.perf_counter() - started) * 1000:.1f}ms")
+                _report(engine, _measure(manager, base_url, args.jobs))
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
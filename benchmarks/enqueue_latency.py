@@ -0,0 +1,77 @@
+"""Compare enqueue latency with a fresh Redis client per call and the shared pool.
+
+Run against the Redis configured through `GDL_REDIS_URL`:
+
+    uv run python -m benchmarks.enqueue_latency --jobs 2000
+
+Jobs go to a scratch queue that is deleted afterwards, so the `downloads`
+queue is never touched.
+"""
+
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+import uuid
+from typing import Callable, List
+
+from redis import Redis
+from rq import Queue
+
+from app.config import settings
+from app.queue import close_redis, get_redis, job_id_for
+
+QUEUE_NAME = "benchmark-enqueue"
+
+
+def _per_call_queue() -> Queue:
+    # Mirrors the historical `get_queue`, which built a new client on every call.
+    return Queue(QUEUE_NAME, connection=Redis.from_url(str(settings.redis_url)))
+
+
+def _pooled_queue() -> Queue:
+    return Queue(QUEUE_NAME, connection=get_redis())
+
+
+def _measure(factory: Callable[[], Queue], jobs: int) -> List[float]:
+    samples: List[float] = []
+    for _ in range(jobs):
+        download_id = uuid.uuid4()
+        started = time.perf_counter()
+        queue = factory()
+        queue.enqueue(
+            "app.worker.process_download",
+            download_id=str(download_id),
+            urls=["https://example.com/benchmark"],
+            post_title=None,
+            job_id=job_id_for(download_id),
+        )
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _report(name: str, samples: List[float]) -> None:
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<10} n={len(samples):<6} mean={statistics.mean(samples) * 1000:.3f}ms "
+        f"p50={statistics.median(samples) * 1000:.3f}ms p99={p99 * 1000:.3f}ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=1000, help="Number of jobs to enqueue per mode.")
+    args = parser.parse_args()
+
+    try:
+        _report("per-call", _measure(_per_call_queue, args.jobs))
+        _report("pooled", _measure(_pooled_queue, args.jobs))
+    finally:
+        _pooled_queue().delete(delete_jobs=True)
+        close_redis()
+
+
+if __name__ == "__main__":
+    main()
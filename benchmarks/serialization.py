@@ -0,0 +1,182 @@
+"""Compare the validated and the row-based serialization of download responses.
+
+Run against a scratch database, since the benchmark inserts (and afterwards
+deletes) its own downloads:
+
+    GDL_DATABASE_URL=sqlite:////tmp/gdl-bench.db uv run python -m benchmarks.serialization
+
+For 10, 1k and 10k items it measures `GET /downloads/{id}` (one download
+holding all items) and `GET /downloads` (a page of `--page` downloads sharing
+them) two ways:
+
+- `model`: validate and dump the response the way FastAPI handles a
+  `response_model`, then encode it with the stdlib. The detail endpoint
+  loads ORM entities and builds `DownloadRead` first; listings validate the
+  row payloads, as the repository has no entity-based listing anymore.
+- `rows`: load rows with `get_payload`/`list_page_payloads` and encode them
+  with orjson, as the API does now.
+
+`load` and `encode` are reported separately, along with the gzip and zstd
+cost and size of each `rows` body.
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import statistics
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+import orjson
+from pydantic import TypeAdapter
+from sqlalchemy import delete
+from sqlmodel import select
+
+from app.api.responses import GZIP_LEVEL, ZSTD_LEVEL, zstandard
+from app.db import init_db, session_scope
+from app.models import DownloadRead, DownloadSummary
+from app.models.entities import Download, DownloadItem, DownloadUrl
+from app.repositories.downloads import DownloadRepository
+
+LABEL = "benchmark-serialization"
+
+DETAIL = TypeAdapter(DownloadRead)
+LISTING = TypeAdapter(List[DownloadRead])
+SUMMARIES = TypeAdapter(List[DownloadSummary])
+
+
+def _seed(downloads: int, items: int) -> List[uuid.UUID]:
+    ids = [uuid.uuid4() for _ in range(downloads)]
+    with session_scope() as session:
+        repo = DownloadRepository(session)
+        repo.create_many(
+            [
+                {
+                    "download_id": download_id,
+                    "urls": [f"https://example.com/benchmark/{download_id.hex}"],
+                    "label": LABEL,
+                    "post_title": "Benchmark post",
+                    "requested_at": datetime.utcnow(),
+                }
+                for download_id in ids
+            ]
+        )
+        for index, download_id in enumerate(ids):
+            count = items // downloads + (1 if index < items % downloads else 0)
+            repo.append_items(
+                download_id,
+                (
+                    {
+                        "filename": f"{number:05d}.jpg",
+                        "relative_path": f"gallery/{number:05d}.jpg",
+                        "file_size": 250_000 + number,
+                        "content_type": "image/jpeg",
+                        "content_hash": f"{number:064x}",
+                    }
+                    for number in range(count)
+                ),
+                commit=False,
+            )
+        session.commit()
+    return ids
+
+
+def _cleanup() -> None:
+    with session_scope() as session:
+        ids = list(session.exec(select(Download.id).where(Download.label == LABEL)).all())
+        session.exec(delete(DownloadItem).where(DownloadItem.download_id.in_(ids)))
+        session.exec(delete(DownloadUrl).where(DownloadUrl.download_id.in_(ids)))
+        session.exec(delete(Download).where(Download.id.in_(ids)))
+        session.commit()
+
+
+def _encode_model(adapter: TypeAdapter, value) -> bytes:
+    # What FastAPI does with a returned object: validate against the
+    # response model, dump it in JSON mode, then `JSONResponse.render`.
+    validated = adapter.validate_python(value, from_attributes=True)
+    content = adapter.dump_python(validated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def _median_ms(func: Callable[[], object], repeat: int) -> Tuple[float, object]:
+    samples = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000, result
+
+
+def _measure(name: str, load_model: Callable, load_rows: Callable, adapter: TypeAdapter, repeat: int) -> None:
+    def load_model_in_session():
+        with session_scope() as session:
+            return load_model(DownloadRepository(session))
+
+    def load_rows_in_session():
+        with session_scope() as session:
+            return load_rows(DownloadRepository(session))
+
+    model_load, record = _median_ms(load_model_in_session, repeat)
+    model_encode, model_body = _median_ms(lambda: _encode_model(adapter, record), repeat)
+    rows_load, payload = _median_ms(load_rows_in_session, repeat)
+    rows_encode, rows_body = _median_ms(lambda: orjson.dumps(payload), repeat)
+    if orjson.loads(rows_body) != orjson.loads(model_body):
+        raise SystemExit(f"{name}: the two paths produced different documents")
+
+    print(
+        f"{name:<14} model load={model_load:8.2f}ms encode={model_encode:8.2f}ms | "
+        f"rows load={rows_load:8.2f}ms encode={rows_encode:7.2f}ms | {len(rows_body) / 1024:8.1f} KiB"
+    )
+    gzip_ms, gzipped = _median_ms(lambda: gzip.compress(rows_body, compresslevel=GZIP_LEVEL, mtime=0), repeat)
+    line = f"{'':<14} gzip={gzip_ms:7.2f}ms {len(gzipped) / 1024:8.1f} KiB"
+    if zstandard is not None:
+        zstd_ms, zstded = _median_ms(lambda: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(rows_body), repeat)
+        line += f" | zstd={zstd_ms:7.2f}ms {len(zstded) / 1024:8.1f} KiB"
+    print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1_000, 10_000], help="Item counts to test.")
+    parser.add_argument("--page", type=int, default=50, help="Downloads per listed page.")
+    parser.add_argument("--repeat", type=int, default=7, help="Runs per measurement; the median is reported.")
+    args = parser.parse_args()
+
+    init_db()
+    _cleanup()
+    try:
+        for size in args.sizes:
+            (detail_id,) = _seed(1, size)
+            _measure(
+                f"detail {size}",
+                lambda repo: repo.get(detail_id),
+                lambda repo: repo.get_payload(detail_id),
+                DETAIL,
+                args.repeat,
+            )
+            _cleanup()
+
+            _seed(args.page, size)
+            for summary in (False, True):
+                load_page = lambda repo: repo.list_page_payloads(  # noqa: E731
+                    limit=args.page, label=LABEL, include_items=not summary
+                )[0]
+                _measure(
+                    f"{'summary' if summary else 'list'} {size}",
+                    load_page,
+                    load_page,
+                    SUMMARIES if summary else LISTING,
+                    args.repeat,
+                )
+            _cleanup()
+    finally:
+        _cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""Stress a SQLite database with concurrent API readers and worker writers.
+
+Run against a scratch SQLite database, since the benchmark inserts (and
+afterwards deletes) its own downloads:
+
+    GDL_DATABASE_URL=sqlite:////tmp/gdl-bench.db uv run python -m benchmarks.sqlite_contention
+    GDL_DATABASE_URL=sqlite:////tmp/gdl-bench.db GDL_SQLITE_WAL=false uv run python -m benchmarks.sqlite_contention
+
+Writer processes run `app.worker.process_download` with gallery-dl replaced
+by a stub that reports `--files` files at `--file-ms` intervals, so every
+status change and item batch goes through the worker's real write path.
+Reader threads meanwhile list downloads and fetch single downloads the way
+the API does. Both report latency and `database is locked` failures.
+"""
+
+from __future__ import annotations
+
+import argparse
+import multiprocessing
+import random
+import statistics
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import List, Tuple
+
+from sqlalchemy import delete
+from sqlalchemy.exc import OperationalError
+from sqlmodel import select
+
+from app.config import settings
+from app.db import engine, init_db, session_scope
+from app.models.entities import Download, DownloadItem, DownloadUrl
+from app.repositories.downloads import DownloadRepository
+
+LABEL = "benchmark-sqlite-contention"
+
+
+def _writer(jobs: int, files: int, file_interval: float, storage: str, results: "multiprocessing.Queue") -> None:
+    import app.worker as worker
+    from app.services.download_manager import DownloadResult
+    from app.storage import FileStat
+
+    def fake_run(download_id, urls, folder_name=None, on_file=None, timer=None):
+        output_path = Path(storage) / str(download_id)
+        for index in range(files):
+            time.sleep(file_interval)
+            on_file(output_path, output_path / f"{index:04d}.jpg", FileStat(64 * 1024, 0))
+        return DownloadResult(output_path, {})
+
+    worker.manager.run = fake_run
+    worker.publish_event = lambda event: None
+    settings.metrics_enabled = False
+
+    durations: List[float] = []
+    locked = 0
+    for _ in range(jobs):
+        download_id = uuid.uuid4()
+        with session_scope() as session:
+            DownloadRepository(session).create_many(
+                [
+                    {
+                        "download_id": download_id,
+                        "urls": [f"https://example.com/benchmark/{download_id.hex}"],
+                        "label": LABEL,
+                        "post_title": None,
+                        "requested_at": datetime.utcnow(),
+                    }
+                ]
+            )
+        started = time.perf_counter()
+        try:
+            worker.process_download(download_id=str(download_id), urls=[f"https://example.com/{download_id.hex}"])
+        except OperationalError:
+            locked += 1
+        durations.append(time.perf_counter() - started)
+    results.put((durations, locked))
+
+
+def _reader(stop: threading.Event, samples: List[float], errors: List[int]) -> None:
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            with session_scope() as session:
+                repo = DownloadRepository(session)
+                page, _ = repo.list_page_payloads(limit=50, label=LABEL, include_items=False)
+                if page:
+                    repo.get_payload(random.choice(page)["id"])
+        except OperationalError:
+            errors[0] += 1
+            continue
+        samples.append(time.perf_counter() - started)
+
+
+def _report(name: str, samples: List[float], failures: int) -> None:
+    if not samples:
+        print(f"{name:<8} n=0 locked={failures}")
+        return
+    ordered = sorted(samples)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<8} n={len(samples):<6} mean={statistics.mean(samples) * 1000:.1f}ms "
+        f"p50={statistics.median(samples) * 1000:.1f}ms p99={p99 * 1000:.1f}ms locked={failures}"
+    )
+
+
+def _cleanup() -> None:
+    with session_scope() as session:
+        ids = list(session.exec(select(Download.id).where(Download.label == LABEL)).all())
+        session.exec(delete(DownloadItem).where(DownloadItem.download_id.in_(ids)))
+        session.exec(delete(DownloadUrl).where(DownloadUrl.download_id.in_(ids)))
+        session.exec(delete(Download).where(Download.id.in_(ids)))
+        session.commit()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=4, help="Worker processes writing at once.")
+    parser.add_argument("--jobs", type=int, default=10, help="Downloads each writer processes.")
+    parser.add_argument("--files", type=int, default=100, help="Files each download reports.")
+    parser.add_argument("--file-ms", type=float, default=2.0, help="Delay between reported files.")
+    parser.add_argument("--readers", type=int, default=8, help="API reader threads.")
+    args = parser.parse_args()
+
+    if engine.url.get_backend_name() != "sqlite" or not engine.url.database:
+        parser.error("the benchmark needs a file-backed SQLite GDL_DATABASE_URL")
+    init_db()
+    with engine.connect() as connection:
+        journal_mode = connection.exec_driver_sql("PRAGMA journal_mode").scalar()
+    print(
+        f"journal_mode={journal_mode} writers={args.writers}x{args.jobs} jobs "
+        f"files={args.files} readers={args.readers} batch={settings.progress_batch_size}"
+    )
+
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    with tempfile.TemporaryDirectory(prefix="gdl-bench-") as storage:
+        writers = [
+            context.Process(target=_writer, args=(args.jobs, args.files, args.file_ms / 1000, storage, results))
+            for _ in range(args.writers)
+        ]
+        started = time.perf_counter()
+        for process in writers:
+            process.start()
+
+        # Readers run until the last writer reports, so every read overlaps write traffic.
+        read_samples: List[float] = []
+        read_errors = [0]
+        stop = threading.Event()
+        readers = [
+            threading.Thread(target=_reader, args=(stop, read_samples, read_errors), daemon=True)
+            for _ in range(args.readers)
+        ]
+        outcomes: List[Tuple[List[float], int]] = []
+        try:
+            for thread in readers:
+                thread.start()
+            for _ in writers:
+                outcomes.append(results.get())
+            elapsed = time.perf_counter() - started
+        finally:
+            stop.set()
+            for thread in readers:
+                thread.join()
+            for process in writers:
+                process.join()
+
+    print(f"elapsed={elapsed:.1f}s")
+    _report("job", [duration for durations, _ in outcomes for duration in durations], sum(n for _, n in outcomes))
+    _report("read", read_samples, read_errors[0])
+    _cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -248,6 +248,8 @@
   let notificationSocket = null;
   let reconnectTimer = null;
   let reconnectAttempt = 0;
+  // Sequence number of the last event seen; reconnects ask the server to replay what came after it.
+  let lastNotificationSeq = null;
 
   function whenDocumentReady(callback) {
     if (document.readyState === "loading") {
@@ -458,19 +460,35 @@
     if (config.token) {
       headers.Authorization = `Bearer ${config.token}`;
     }
+    fetchDownloadPages(base, headers, null, []);
+  }
+
+  // The list is paginated, so follow `X-Next-Cursor` until the last page and only
+  // then reconcile: a tracked job missing from one page may sit on the next.
+  function fetchDownloadPages(base, headers, cursor, collected) {
+    const query = cursor ? `summary=true&cursor=${encodeURIComponent(cursor)}` : "summary=true";
     GM_xmlhttpRequest({
       method: "GET",
-      url: `${base}/downloads`,
+      url: `${base}/downloads?${query}`,
       headers,
       onload: (response) => {
         if (response.status >= 200 && response.status < 300) {
+          let payload;
           try {
-            const payload = JSON.parse(response.responseText);
-            if (Array.isArray(payload)) {
-              updateDownloadsFromList(payload);
-            }
+            payload = JSON.parse(response.responseText);
           } catch (error) {
             console.debug("Failed to parse downloads list", error);
+            return;
+          }
+          if (!Array.isArray(payload)) {
+            return;
+          }
+          collected.push(...payload);
+          const nextCursor = getResponseHeader(response, "X-Next-Cursor");
+          if (nextCursor) {
+            fetchDownloadPages(base, headers, nextCursor, collected);
+          } else {
+            updateDownloadsFromList(collected);
           }
         } else {
           console.debug("Failed to load downloads", response.status, response.statusText);
@@ -482,6 +500,17 @@
     });
   }
 
+  function getResponseHeader(response, name) {
+    const wanted = name.toLowerCase();
+    for (const line of (response.responseHeaders || "").split(/\r?\n/)) {
+      const separator = line.indexOf(":");
+      if (separator > 0 && line.slice(0, separator).trim().toLowerCase() === wanted) {
+        return line.slice(separator + 1).trim();
+      }
+    }
+    return null;
+  }
+
   function updateDownloadsFromList(items) {
     const seen = new Set();
     items.forEach((item) => {
@@ -1022,13 +1051,28 @@
     const trimmedBase = (config.apiBase || "").trim().replace(/\/+$/, "");
     const protocol = determineWebSocketScheme(trimmedBase);
     const host = trimmedBase.replace(/^https?:\/\//i, "");
-    return `${protocol}${host}${NOTIFICATION_WS_PATH}?token=${encodeURIComponent(config.token)}`;
+    const since = lastNotificationSeq === null ? "" : `&since=${lastNotificationSeq}`;
+    return `${protocol}${host}${NOTIFICATION_WS_PATH}?token=${encodeURIComponent(config.token)}${since}`;
   }
 
   function handleNotificationMessage(payload) {
     if (!payload || typeof payload !== "object") {
       return;
     }
+    if (payload.type === "welcome" || payload.type === "resync_required") {
+      // A resumed stream replays missed events next, so only a fresh or resynced stream reloads the panel.
+      const resumed = payload.type === "welcome" && lastNotificationSeq !== null;
+      if (typeof payload.seq === "number" && !resumed) {
+        lastNotificationSeq = payload.seq;
+      }
+      if (!resumed) {
+        schedulePanelRefresh(1000);
+      }
+      return;
+    }
+    if (typeof payload.seq === "number") {
+      lastNotificationSeq = payload.seq;
+    }
     handlePanelNotification(payload);
     if (payload.type !== "queued") {
       return;
@@ -0,0 +1,29 @@
+"""Point the settings at a scratch SQLite database before `app` is imported."""
+
+import os
+import tempfile
+from pathlib import Path
+
+_SCRATCH = Path(tempfile.mkdtemp(prefix="gdl-tests-"))
+os.environ["GDL_DATABASE_URL"] = f"sqlite:///{_SCRATCH / 'gallery.db'}"
+os.environ["GDL_STORAGE_ROOT"] = str(_SCRATCH / "downloads")
+os.environ["GDL_METRICS_ENABLED"] = "false"
+
+import pytest  # noqa: E402
+from sqlalchemy import delete  # noqa: E402
+
+from app.db import init_db, session_scope  # noqa: E402
+from app.models.entities import Download, DownloadItem, DownloadUrl  # noqa: E402
+from app.repositories.downloads import DownloadRepository  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def repo():
+    with session_scope() as session:
+        yield DownloadRepository(session)
+    with session_scope() as session:
+        for model in (DownloadItem, DownloadUrl, Download):
+            session.exec(delete(model))
+        session.commit()
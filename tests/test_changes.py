@@ -0,0 +1,64 @@
+"""The change feed follows commit order, not the time a write was stamped."""
+
+import uuid
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app.models.entities import Download
+from app.models.schemas import DownloadStatus
+
+
+def create(repo) -> uuid.UUID:
+    download_id = uuid.uuid4()
+    repo.create(
+        download_id=download_id,
+        urls=[f"https://example.com/changes/{download_id.hex}"],
+        label=None,
+        post_title=None,
+        requested_at=datetime.utcnow(),
+    )
+    return download_id
+
+
+def changed_ids(repo, after=None):
+    repo.session.expire_all()
+    payloads, token, has_more = repo.list_changes(limit=100, after=after, include_items=False)
+    return [payload["id"] for payload in payloads], token
+
+
+def test_changes_are_reported_once_committed(repo):
+    first, second = create(repo), create(repo)
+    ids, token = changed_ids(repo)
+    assert ids == [first, second]
+
+    repo.set_status(first, DownloadStatus.running)
+    ids, token = changed_ids(repo, token)
+    assert ids == [first]
+
+    ids, _ = changed_ids(repo, token)
+    assert ids == []
+
+
+def test_late_commit_with_an_old_stamp_is_not_skipped(repo):
+    stamped_early = create(repo)
+    _, token = changed_ids(repo)
+
+    # A write stamped before the token was handed out but committed after it.
+    repo.session.exec(
+        update(Download).where(Download.id == stamped_early).values(updated_at=datetime(2000, 1, 1))
+    )
+    repo.session.commit()
+
+    ids, _ = changed_ids(repo, token)
+    assert ids == [stamped_early]
+
+
+def test_recording_items_reports_the_download(repo):
+    download_id = create(repo)
+    _, token = changed_ids(repo)
+
+    repo.append_items(download_id, [{"filename": "1.jpg", "relative_path": "1.jpg", "file_size": 1}])
+
+    ids, _ = changed_ids(repo, token)
+    assert ids == [download_id]
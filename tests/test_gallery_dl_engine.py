@@ -0,0 +1,70 @@
+"""The in-process engine relies on gallery-dl's archive API; fail loudly if it changes."""
+
+import sqlite3
+from pathlib import Path
+from typing import List
+
+import pytest
+
+pytest.importorskip("gallery_dl")
+
+from gallery_dl import archive, config  # noqa: E402
+
+from app.services.gallery_dl_engine import InProcessEngine, _ReportingJob  # noqa: E402
+
+URL = "https://example.org/media/picture.jpg"
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    def download(self, url):
+        # Stand in for the HTTP download: write the file gallery-dl would fetch.
+        with self.pathfmt.open("wb") as file:
+            file.write(b"picture")
+        return True
+
+    monkeypatch.setattr(_ReportingJob, "download", download)
+    yield InProcessEngine(tmp_path / "missing-config.json", archive_path=tmp_path / "archive.sqlite3")
+    config.clear()
+
+
+def run(engine: InProcessEngine, destination: Path) -> List[Path]:
+    reported: List[Path] = []
+    engine.run([URL], destination, reported.append)
+    return reported
+
+
+def test_archive_key_matches_the_stored_entry(engine, tmp_path):
+    engine._configure(tmp_path / "first")
+    reporting_job = _ReportingJob(URL, paths=None, cancelled=None)
+    reporting_job.initialize()
+    assert type(reporting_job.archive) is archive.DownloadArchive
+
+    kwdict = {
+        "category": "directlink",
+        "domain": "example.org",
+        "path": "media",
+        "filename": "picture",
+        "extension": "jpg",
+    }
+    key = reporting_job._archive_key(kwdict)
+    reporting_job.archive.add(kwdict)
+    reporting_job.archive.close()
+
+    with sqlite3.connect(tmp_path / "archive.sqlite3") as connection:
+        assert [row[0] for row in connection.execute("SELECT entry FROM archive")] == [key]
+
+
+def test_archived_file_is_linked_into_a_new_destination(engine, tmp_path, monkeypatch):
+    first = run(engine, tmp_path / "first")
+    assert [path.read_bytes() for path in first] == [b"picture"]
+
+    def refuse(self, url):
+        raise AssertionError("archived media must not be downloaded again")
+
+    monkeypatch.setattr(_ReportingJob, "download", refuse)
+    second = run(engine, tmp_path / "second")
+
+    assert len(second) == 1
+    assert second[0].is_relative_to(tmp_path / "second")
+    assert second[0].read_bytes() == b"picture"
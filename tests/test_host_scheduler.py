@@ -0,0 +1,44 @@
+"""Site slots are short leases that running jobs renew and finished or dead jobs give back."""
+
+import time
+
+import fakeredis
+import pytest
+
+from app.config import settings
+from app.services.host_scheduler import HostScheduler
+
+SITE = "pixeldrain"
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setattr(settings, "host_concurrency", 1)
+    return HostScheduler(fakeredis.FakeStrictRedis())
+
+
+def expiry(scheduler: HostScheduler, job_id: str):
+    return scheduler.connection.zscore(scheduler._slots_key(SITE), job_id)
+
+
+def test_lease_is_short_regardless_of_the_job_timeout(scheduler):
+    assert scheduler.acquire(SITE, "job-1") == 0
+    assert expiry(scheduler, "job-1") <= time.time() + settings.host_lease_seconds
+    assert scheduler.acquire(SITE, "job-2") > 0
+
+
+def test_refresh_extends_a_held_slot_only(scheduler):
+    scheduler.acquire(SITE, "job-1", lease_seconds=10)
+    scheduler.refresh(SITE, "job-1", lease_seconds=600)
+    assert expiry(scheduler, "job-1") > time.time() + 500
+
+    scheduler.release(SITE, "job-1")
+    scheduler.refresh(SITE, "job-1")
+    assert expiry(scheduler, "job-1") is None
+    assert scheduler.acquire(SITE, "job-2") == 0
+
+
+def test_expired_lease_frees_the_slot(scheduler):
+    scheduler.acquire(SITE, "job-1")
+    scheduler.connection.zadd(scheduler._slots_key(SITE), {"job-1": time.time() - 1})
+    assert scheduler.acquire(SITE, "job-2") == 0
@@ -0,0 +1,49 @@
+"""A run stats each file once per snapshot it needs, not again after streaming."""
+
+import uuid
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+
+from app.services.download_manager import DownloadManager
+from app.storage import FileStat
+
+URL = "https://pixeldrain.com/l/inventory"
+
+
+@pytest.fixture
+def stats(monkeypatch) -> List[int]:
+    calls: List[int] = []
+    from_stat = FileStat.from_stat.__func__
+
+    def counting(cls, result):
+        calls.append(result.st_size)
+        return from_stat(cls, result)
+
+    monkeypatch.setattr(FileStat, "from_stat", classmethod(counting))
+    return calls
+
+
+def test_run_stats_streamed_and_existing_files_once(tmp_path, monkeypatch, stats):
+    manager = DownloadManager(storage_root=tmp_path, extra_args=[], engine="subprocess")
+    download_id = uuid.uuid4()
+    destination, _ = manager._prepare(download_id, [URL], "Inventory")
+    for name in ("old.jpg", "kept.jpg"):
+        (destination / name).write_bytes(b"old")
+
+    def stream(command: List[str], report: Callable[[Path], None]) -> None:
+        (destination / "new.jpg").write_bytes(b"new")
+        report(destination / "kept.jpg")
+        report(destination / "new.jpg")
+        # Post-processors write files gallery-dl does not print.
+        (destination / "new.json").write_bytes(b"{}")
+
+    monkeypatch.setattr(manager, "_stream", stream)
+    reported: List[str] = []
+    result = manager.run(download_id, [URL], "Inventory", on_file=lambda root, path, stat: reported.append(path.name))
+
+    assert reported == ["new.jpg"]
+    assert sorted(path.name for path in result.files) == ["new.jpg", "new.json"]
+    # Two files before the run, two reported while streaming, one found afterwards.
+    assert len(stats) == 5
@@ -0,0 +1,102 @@
+"""Statement-count regression tests: reads must not issue a query per download or item."""
+
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event
+
+from app.db import engine
+from app.models.schemas import DownloadStatus
+
+
+@contextmanager
+def count_statements() -> Iterator[List[str]]:
+    statements: List[str] = []
+
+    def record(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+
+def seed(
+    repo, count: int, *, items: int = 3, status: DownloadStatus = DownloadStatus.succeeded, path: str = "album"
+) -> List[str]:
+    """Insert `count` downloads with `items` items each and return their URLs."""
+    started = datetime.utcnow()
+    records = [
+        {
+            "download_id": uuid.uuid4(),
+            "urls": [f"https://example.com/{path}/{index}"],
+            "post_title": f"Post {index}",
+            "requested_at": started + timedelta(seconds=index),
+        }
+        for index in range(count)
+    ]
+    repo.create_many(records)
+    for record in records:
+        repo.append_items(
+            record["download_id"],
+            (
+                {"filename": f"{number}.jpg", "relative_path": f"{number}.jpg", "file_size": 100}
+                for number in range(items)
+            ),
+            commit=False,
+        )
+        repo.set_status(record["download_id"], status, commit=False)
+    repo.session.commit()
+    return [url for record in records for url in record["urls"]]
+
+
+def statements_for(repo, call) -> int:
+    repo.session.expire_all()
+    with count_statements() as statements:
+        call()
+    return len(statements)
+
+
+@pytest.mark.parametrize("status", [DownloadStatus.succeeded, DownloadStatus.failed])
+def test_find_duplicates_is_constant(repo, status):
+    urls = seed(repo, 20, status=status)
+
+    one = statements_for(repo, lambda: repo.find_duplicates(urls[:1]))
+    many = statements_for(repo, lambda: repo.find_duplicates(urls))
+
+    assert one == many
+
+
+def test_find_duplicates_loads_items_of_the_returned_download_only(repo):
+    urls = seed(repo, 10, items=5)
+    failed_urls = seed(repo, 10, items=5, status=DownloadStatus.failed, path="failed")
+
+    repo.session.expire_all()
+    with count_statements() as statements:
+        active, failed = repo.find_duplicates(urls + failed_urls)
+    item_queries = [statement for statement in statements if "FROM downloaditem" in statement]
+    assert active.item_count == 5
+    assert failed is not None
+    assert len(item_queries) == 1
+
+    repo.session.expire_all()
+    with count_statements() as statements:
+        active, failed = repo.find_duplicates(failed_urls)
+    assert active is None
+    assert failed is not None
+    assert not [statement for statement in statements if "FROM downloaditem" in statement]
+
+
+@pytest.mark.parametrize("include_items", [True, False])
+def test_list_page_payloads_is_constant(repo, include_items):
+    seed(repo, 30, items=5)
+
+    small = statements_for(repo, lambda: repo.list_page_payloads(limit=2, include_items=include_items))
+    large = statements_for(repo, lambda: repo.list_page_payloads(limit=25, include_items=include_items))
+
+    assert small == large
@@ -0,0 +1,72 @@
+"""Aged jobs climb one tier per aging period and every waiting job is considered."""
+
+from datetime import datetime, timedelta, timezone
+
+import fakeredis
+import pytest
+from rq import Queue
+
+from app.queue import DEFAULT_QUEUE, HIGH_PRIORITY_QUEUE, LOW_PRIORITY_QUEUE, mark_tier_entered, promote_aged_jobs
+
+AGING = 600
+
+
+@pytest.fixture
+def connection():
+    return fakeredis.FakeStrictRedis()
+
+
+def enqueue(connection, queue_name: str, count: int, *, age: float) -> Queue:
+    queue = Queue(queue_name, connection=connection)
+    created_at = datetime.now(timezone.utc) - timedelta(seconds=age)
+    for _ in range(count):
+        job = queue.create_job("app.worker.process_download", kwargs={"urls": []})
+        job.created_at = created_at
+        queue.enqueue_job(job)
+    return queue
+
+
+def test_every_aged_low_job_moves_to_default(connection):
+    low = enqueue(connection, LOW_PRIORITY_QUEUE, 25, age=AGING + 1)
+    enqueue(connection, LOW_PRIORITY_QUEUE, 5, age=0)
+
+    assert promote_aged_jobs(connection, AGING, batch_size=10) == 25
+    assert low.count == 5
+    assert Queue(DEFAULT_QUEUE, connection=connection).count == 25
+
+
+def test_promoted_job_waits_again_before_the_next_tier(connection):
+    enqueue(connection, LOW_PRIORITY_QUEUE, 1, age=3 * AGING)
+
+    assert promote_aged_jobs(connection, AGING) == 1
+    assert promote_aged_jobs(connection, AGING) == 0
+    assert Queue(HIGH_PRIORITY_QUEUE, connection=connection).count == 0
+
+
+def test_default_jobs_age_into_high_a_few_at_a_time(connection):
+    default = enqueue(connection, DEFAULT_QUEUE, 15, age=AGING + 1)
+    high = Queue(HIGH_PRIORITY_QUEUE, connection=connection)
+
+    assert promote_aged_jobs(connection, AGING, high_limit=10) == 10
+    assert high.count == 10
+    assert default.count == 5
+
+
+def test_deferred_job_keeps_its_age(connection):
+    low = enqueue(connection, LOW_PRIORITY_QUEUE, 1, age=AGING + 1)
+    job = low.jobs[0]
+    # A deferral re-enqueues the job, which resets `enqueued_at` but not its age.
+    low.remove(job)
+    low.enqueue_job(job)
+
+    assert promote_aged_jobs(connection, AGING) == 1
+
+
+def test_job_moved_to_a_tier_on_purpose_starts_aging_again(connection):
+    low = enqueue(connection, LOW_PRIORITY_QUEUE, 1, age=AGING + 1)
+    job = low.jobs[0]
+    low.remove(job)
+    mark_tier_entered(job)
+    low.enqueue_job(job)
+
+    assert promote_aged_jobs(connection, AGING) == 0
@@ -0,0 +1,110 @@
+"""Resubmitting a failed download must keep the files its earlier attempt recorded."""
+
+import subprocess
+import uuid
+from pathlib import Path
+from typing import Callable, List
+
+import pytest
+
+import app.api.downloads as downloads_api
+import app.worker as worker
+from app.models import DownloadCreate
+from app.models.schemas import DownloadStatus
+from app.services.urls import url_hash
+
+URL = "https://pixeldrain.com/l/album"
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch, tmp_path):
+    """Keep Redis out of the tests: jobs are run directly and events are dropped.
+
+    Each test also downloads into a storage root of its own.
+    """
+    monkeypatch.setattr(worker.manager.storage, "root", tmp_path)
+    monkeypatch.setattr(downloads_api, "_enqueue_download_job", lambda *args: None)
+    monkeypatch.setattr(downloads_api, "_enqueue_download_jobs", lambda records: None)
+    monkeypatch.setattr(worker, "publish_event", lambda event: None)
+
+
+def gallery_dl(monkeypatch, files: List[str], *, fail: bool = False) -> None:
+    """Stand in for the gallery-dl CLI: write `files` into the destination and print each one."""
+
+    def stream(command: List[str], report: Callable[[Path], None]) -> None:
+        destination = Path(command[command.index("--dest") + 1])
+        for name in files:
+            path = destination / name
+            if not path.exists():
+                path.write_bytes(name.encode())
+            report(path)
+        if fail:
+            raise subprocess.CalledProcessError(1, command)
+
+    monkeypatch.setattr(worker.manager, "_stream", stream)
+
+
+def submit(post_title: str, url: str = URL) -> uuid.UUID:
+    download_id = uuid.uuid4()
+    downloads_api._store_download(download_id, [url], DownloadCreate(urls=[url], post_title=post_title))
+    return download_id
+
+
+def run(download_id: uuid.UUID, url: str = URL) -> None:
+    try:
+        worker.process_download(download_id=str(download_id), urls=[url])
+    except subprocess.CalledProcessError:
+        pass
+
+
+def recorded(repo, download_id: uuid.UUID) -> List[str]:
+    repo.session.expire_all()
+    payload = repo.get_payload(download_id)
+    return sorted(item["relative_path"] for item in payload["items"])
+
+
+# The second case differs only in a tracking parameter, which neither
+# deduplication nor the folder layout takes into account.
+@pytest.mark.parametrize("first_url", [URL, f"{URL}?utm_source=forum"])
+def test_resubmit_keeps_files_of_the_failed_attempt(repo, monkeypatch, first_url):
+    first = submit("Resubmitted post", first_url)
+    gallery_dl(monkeypatch, ["1.jpg", "2.jpg"], fail=True)
+    run(first, first_url)
+    assert repo.get_payload(first)["status"] == DownloadStatus.failed
+
+    second = submit("Resubmitted post")
+    # gallery-dl reports the files it finds already on disk as well as new ones.
+    gallery_dl(monkeypatch, ["1.jpg", "2.jpg", "3.jpg"])
+    run(second)
+
+    assert repo.get_payload(first) is None
+    payload = repo.get_payload(second)
+    assert payload["status"] == DownloadStatus.succeeded
+    assert recorded(repo, second) == ["1.jpg", "2.jpg", "3.jpg"]
+    assert payload["item_count"] == 3
+
+
+def test_resubmit_under_another_title_starts_over(repo, monkeypatch):
+    first = submit("Old title")
+    gallery_dl(monkeypatch, ["1.jpg"], fail=True)
+    run(first)
+
+    second = submit("New title")
+    gallery_dl(monkeypatch, ["1.jpg", "2.jpg"])
+    run(second)
+
+    assert repo.get_payload(first) is None
+    assert recorded(repo, second) == ["1.jpg", "2.jpg"]
+
+
+def test_batch_resubmit_keeps_files_of_the_failed_attempt(repo, monkeypatch):
+    first = submit("Batch post")
+    gallery_dl(monkeypatch, ["1.jpg"], fail=True)
+    run(first)
+
+    entry = DownloadCreate(urls=[URL], post_title="Batch post")
+    results, _ = downloads_api._store_batch([(0, entry, [URL], [url_hash(URL)])])
+    second = results[0].download_id
+
+    assert repo.get_payload(first) is None
+    assert recorded(repo, second) == ["1.jpg"]
@@ -0,0 +1,34 @@
+"""Jobs only run downloads that are still queued."""
+
+import uuid
+from datetime import datetime
+
+import pytest
+
+import app.worker as worker
+from app.models.schemas import DownloadStatus
+
+URL = "https://pixeldrain.com/l/claimed"
+
+
+@pytest.fixture(autouse=True)
+def offline(monkeypatch):
+    monkeypatch.setattr(worker, "publish_event", lambda event: None)
+
+
+def test_job_of_a_cancelled_download_does_not_run(repo, monkeypatch):
+    download_id = uuid.uuid4()
+    repo.create(download_id=download_id, urls=[URL], label=None, post_title=None, requested_at=datetime.utcnow())
+    repo.cancel(download_id, finished_at=datetime.utcnow())
+
+    def run(*args, **kwargs):
+        raise AssertionError("a cancelled download must not be downloaded")
+
+    monkeypatch.setattr(worker.manager, "run", run)
+    worker.process_download(download_id=str(download_id), urls=[URL], post_title="Late title")
+
+    repo.session.expire_all()
+    payload = repo.get_payload(download_id)
+    assert payload["status"] == DownloadStatus.cancelled
+    assert payload["started_at"] is None
+    assert payload["post_title"] is None